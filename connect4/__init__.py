@@ -0,0 +1 @@
+"""Connect Four game engine shared by main.py and tournament.py."""
@@ -0,0 +1,108 @@
+"""Batch analysis: stream many positions through one process or a worker pool.
+
+Positions are read in either of two formats, which may be mixed:
+
+* the block format of the single-board input files: an algorithm line, a
+  player line and the board rows, top row first;
+* one position per line: ``ALGORITHM PLAYER ROWS``, the rows joined by "/".
+
+Boards may have any number of rows and columns (six or seven for the standard
+board).  A block's board ends at the first line that is not a board row, so it
+is answered once the next line (or the end of the input) has been read; a
+one-line position is answered as soon as its line is complete.
+
+Blank lines and lines starting with "#" are skipped.  Every position produces
+one JSON object on its own line, written in input order as soon as it and all
+the positions before it are done.
+"""
+
+import json
+from collections import deque
+
+from connect4.bitboard import EMPTY, RED, YELLOW
+
+PENDING_PER_WORKER = 4  # Positions queued ahead per worker while streaming
+CELLS = frozenset((EMPTY, RED, YELLOW))
+
+
+def is_row(line):
+    return bool(line) and set(line) <= CELLS
+
+
+def parse_rows(rows, line_number):
+    """Check that the board rows are rows of cells of one length and return them as lists."""
+    if not rows or not all(is_row(row) for row in rows):
+        raise ValueError(f"line {line_number}: expected rows of {EMPTY}, {RED} and {YELLOW} cells")
+    if any(len(row) != len(rows[0]) for row in rows):
+        raise ValueError(f"line {line_number}: board rows differ in length")
+    return [list(row) for row in rows]
+
+
+def read_positions(lines):
+    """Yield (algorithm, player, board) for every position in ``lines``."""
+    numbered = (
+        (number, line.strip())
+        for number, line in enumerate(lines, 1)
+        if line.strip() and not line.lstrip().startswith("#")
+    )
+    following = None  # A line read past the end of a block's board
+    while True:
+        if following is None:
+            following = next(numbered, None)
+            if following is None:
+                return
+        (number, line), following = following, None
+        fields = line.split()
+        if len(fields) == 3:
+            algorithm, player, rows = fields
+            yield algorithm, player, parse_rows(rows.split("/"), number)
+            continue
+        if len(fields) != 1:
+            raise ValueError(f"line {number}: expected ALGORITHM PLAYER ROWS or an algorithm line")
+        player = next(numbered, (None, None))[1]
+        if player is None:
+            raise ValueError(f"line {number}: position block ends early")
+        rows = []
+        for following in numbered:
+            if not is_row(following[1]):
+                break
+            rows.append(following[1])
+        else:
+            following = None
+        yield line, player, parse_rows(rows, number)
+
+
+def imap_ordered(function, items, workers=1):
+    """Yield ``function(*item)`` for each item, in order, from a pool of ``workers``.
+
+    At most PENDING_PER_WORKER items per worker are submitted ahead of the
+    result being yielded, so an unbounded input stream is never read far ahead.
+    """
+    if workers <= 1:
+        for item in items:
+            yield function(*item)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque()
+        for item in items:
+            pending.append(pool.submit(function, *item))
+            if len(pending) >= workers * PENDING_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def run_batch(positions, analyse, output, workers=1):
+    """Write ``analyse(index, *position)`` as one JSON line per position.
+
+    Returns the number of positions analysed.
+    """
+    count = 0
+    items = ((index, *position) for index, position in enumerate(positions))
+    for result in imap_ordered(analyse, items, workers):
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+        count += 1
+    return count
@@ -0,0 +1,128 @@
+"""Vectorized random rollouts: thousands of games advanced in lockstep with NumPy.
+
+Each game is a pair of uint64 bitboards plus a row of column heights, in the
+same layout as connect4.bitboard.  Every step plays one uniformly random legal
+move in all unfinished games at once and tests them for a winning line with
+the same shift trick as Geometry.has_won().  All games start from one
+position, so the side to move is the same in every game at every step.  Any
+geometry whose bitboard fits in 64 bits can be rolled out (up to 9x6 or 8x7).
+"""
+
+import functools
+
+import numpy as np
+
+from connect4.bitboard import STANDARD, WIN_VALUES
+from connect4.mcts import fill_mirrored, iterate_budget
+
+TIMED_BATCH = 1024  # Rollouts per column between clock checks in a timed search
+
+_ONE = np.uint64(1)
+
+
+@functools.lru_cache(maxsize=None)
+def _shift_steps(geometry):
+    """Per direction, the shifts Geometry.has_won() ANDs together, as uint64s."""
+    steps = []
+    for shift in geometry.shifts:
+        amounts, length = [], 1
+        while 2 * length <= geometry.connect:
+            amounts.append(length * shift)
+            length *= 2
+        if length < geometry.connect:
+            amounts.append((geometry.connect - length) * shift)
+        steps.append([np.uint64(amount) for amount in amounts])
+    return steps
+
+
+def has_won(bits, geometry=STANDARD):
+    """Vectorized Geometry.has_won(): True where a uint64 bitboard has a line."""
+    found = np.zeros(bits.shape, dtype=bool)
+    for amounts in _shift_steps(geometry):
+        run = bits
+        for amount in amounts:
+            run = run & (run >> amount)
+        found |= run != 0
+    return found
+
+
+def batch_rollouts(position, count, rng=None):
+    """Play ``count`` random games out from ``position``.
+
+    Returns an int8 vector of game values from YELLOW's point of view: 1 for a
+    YELLOW win, -1 for a RED win and 0 for a draw.
+    """
+    geometry = position.geometry
+    if geometry.width * geometry.stride > 64:
+        raise ValueError(f"A {geometry.name} board does not fit in a 64-bit bitboard")
+    rng = np.random.default_rng(rng)
+    results = np.zeros(count, dtype=np.int8)
+    result = position.result()
+    if result is not None:
+        results[:] = result
+        return results
+
+    tops = np.array(geometry.top_cells, dtype=np.int64)
+    boards = np.empty((count, 2), dtype=np.uint64)
+    boards[:, 0] = position.boards[0]
+    boards[:, 1] = position.boards[1]
+    heights = np.tile(np.array(position.heights, dtype=np.int64), (count, 1))
+    turn = position.turn
+    games = np.arange(count)  # Indices of the unfinished games
+
+    while games.size:
+        game_heights = heights[games]
+        legal = game_heights < tops
+        open_columns = legal.sum(axis=1)
+        playable = open_columns > 0  # Full boards are draws and already hold 0
+        games, game_heights, legal, open_columns = (
+            games[playable], game_heights[playable], legal[playable], open_columns[playable]
+        )
+        if not games.size:
+            break
+
+        # Pick the k-th open column of each game, k uniform in [0, open_columns)
+        k = (rng.random(games.size) * open_columns).astype(np.int64)
+        cols = (np.cumsum(legal, axis=1) <= k[:, None]).sum(axis=1)
+        cells = game_heights[np.arange(games.size), cols]
+        heights[games, cols] += 1
+        bits = boards[games, turn] | (_ONE << cells.astype(np.uint64))
+        boards[games, turn] = bits
+
+        won = has_won(bits, geometry)
+        results[games[won]] = WIN_VALUES[turn]
+        games = games[~won]
+        turn ^= 1
+    return results
+
+
+def pmcgs_batch_statistics(position, simulations, rng=None, deadline=None):
+    """Batched equivalent of mcts.pmcgs_statistics(): (wi, ni) per column.
+
+    With a ``deadline``, every column gets batches of TIMED_BATCH rollouts in
+    turn until the deadline (or ``simulations``, if not None) is reached.
+    """
+    rng = np.random.default_rng(rng)
+    wi = [0] * position.geometry.width
+    ni = [0] * position.geometry.width
+    children = []
+    for col in position.distinct_moves():
+        child = position.copy()
+        child.play(col)
+        children.append((col, child))
+
+    if deadline is None:
+        batches = [simulations]
+    else:
+        limit = None if simulations is None else -(-simulations // TIMED_BATCH)
+        # The last batch is cut short so that ``simulations`` stays an upper bound
+        batches = (
+            TIMED_BATCH if simulations is None else min(TIMED_BATCH, simulations - done)
+            for done in (index * TIMED_BATCH for index in iterate_budget(limit, deadline))
+        )
+    for batch in batches:
+        for col, child in children:
+            wi[col] += int(batch_rollouts(child, batch, rng).sum())
+            ni[col] += batch
+    fill_mirrored(position, wi, ni)
+    return wi, ni
@@ -0,0 +1,390 @@
+"""Benchmark suite: board primitives, rollouts and engines on fixed positions.
+
+    python -m connect4.benchmark [--quick] [--output bench.json] [--baseline old.json]
+    python -m connect4.benchmark --startup
+
+The positions are the boards of test1-3.txt plus midgame and endgame sets
+generated by random play from a fixed seed, so every run measures the same
+work.  Reported are nanoseconds per board operation, rollouts per second per
+rollout policy (on the standard board and the larger GEOMETRIES), and for
+every engine the per-move latency percentiles, playouts per second and peak
+traced memory.  Memory is measured in a separate pass, because tracemalloc
+slows everything it watches.
+
+Start-up is measured too: the time to import main.py and tournament.py in a
+fresh interpreter, which every command-line run pays before its first
+search.  It must stay under STARTUP_BUDGET_MS, and neither script may load
+any of LAZY_MODULES at import; ``--startup`` runs only this check and exits
+with status 1 when it fails.
+
+With ``--baseline`` every metric is compared to a saved run: names ending in
+``_per_s`` are better when higher, all others (times, memory) when lower.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from connect4.bitboard import STANDARD, Position, get_geometry, has_four
+from connect4.engines import UCT, make_engine, parse_spec
+from connect4.mcts import RAVE_EQUIVALENCE
+from connect4.rollouts import ROLLOUTS
+from connect4.seeding import SEED_BITS
+from connect4.solver import SOLVE_BELOW, Solver
+from connect4.transposition import TranspositionTable
+
+BENCH_SEED = 20241017
+TEST_FILES = ("test1.txt", "test2.txt", "test3.txt")
+MIDGAME_PLIES = 14
+ENDGAME_EMPTY = SOLVE_BELOW + 2  # Just above the solver's threshold, for the searches
+SET_SIZE = 8  # Positions per generated set
+REGRESSION = 0.05  # Relative change reported as a regression or an improvement
+GEOMETRIES = ((8, 7, 4), (9, 7, 4))  # Other board sizes whose rollouts are timed
+STARTUP_SCRIPTS = ("main", "tournament")  # Imported from the directory above the package
+STARTUP_BUDGET_MS = 100  # Per script import, best of STARTUP_REPEAT fresh interpreters
+STARTUP_REPEAT = 5
+# Loaded only by the modes that need them: process pools, the server, NumPy, plotting
+LAZY_MODULES = ("concurrent.futures", "multiprocessing", "asyncio", "numpy", "matplotlib")
+# (PMCGS rollouts per column, UCT iterations, rollouts per position) for full and quick runs
+BUDGETS = {False: (100, 2000, 2000), True: (10, 200, 200)}
+
+
+def load_test_positions(directory):
+    """The boards of test1-3.txt in ``directory`` (skipping missing files)."""
+    positions = {}
+    for name in TEST_FILES:
+        path = os.path.join(directory, name)
+        if not os.path.exists(path):
+            continue
+        with open(path, "r") as file:
+            lines = [line.strip() for line in file]
+        positions[name.rsplit(".", 1)[0]] = Position.from_rows(
+            [list(row) for row in lines[2:8]], lines[1]
+        )
+    return positions
+
+
+def random_positions(count, plies=None, empty=None, seed=BENCH_SEED, geometry=STANDARD):
+    """``count`` unfinished positions after ``plies`` random moves (or down to ``empty`` cells)."""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        position = Position(geometry=geometry)
+        while position.result() is None and (
+            len(position.moves) < plies if plies is not None else position.empty_cells() > empty
+        ):
+            position.play(rng.choice(position.legal_moves()))
+        if position.result() is None:
+            positions.append(position)
+    return positions
+
+
+def benchmark_positions(directory):
+    """Named sets of positions: the test files, midgame and endgame."""
+    return {
+        "tests": list(load_test_positions(directory).values()),
+        "midgame": random_positions(SET_SIZE, plies=MIDGAME_PLIES),
+        "endgame": random_positions(SET_SIZE, empty=ENDGAME_EMPTY, seed=BENCH_SEED + 1),
+    }
+
+
+def per_call_ns(function, calls, repeat=5):
+    """Best of ``repeat`` timings of ``function()`` (which makes ``calls`` calls), per call."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        function()
+        best = min(best, time.perf_counter_ns() - start)
+    return round(best / calls, 1)
+
+
+def micro_benchmarks(positions, loops):
+    """Nanoseconds per board primitive, averaged over every open column of ``positions``."""
+    cases = [(position.copy(), col) for position in positions for col in position.legal_moves()]
+
+    def play_undo():
+        for _ in range(loops):
+            for position, col in cases:
+                position.play(col)
+                position.undo()
+
+    def last_move_won():
+        for _ in range(loops):
+            for position, _ in cases:
+                position.last_move_won()
+
+    boards = [position.boards[0] for position, _ in cases]
+
+    def four_in_a_row():
+        for _ in range(loops):
+            for bits in boards:
+                has_four(bits)
+
+    def threats():
+        for _ in range(loops):
+            for position, _ in cases:
+                position._threats = [(0, 0), (0, 0)]  # Defeat the cache: time the computation
+                position.threats(position.turn)
+
+    calls = loops * len(cases)
+    return {
+        "play_undo_ns": per_call_ns(play_undo, calls),
+        "last_move_won_ns": per_call_ns(last_move_won, calls),
+        "has_four_ns": per_call_ns(four_in_a_row, calls),
+        "threats_ns": per_call_ns(threats, calls),
+    }
+
+
+def rollout_benchmarks(positions, rollouts):
+    """Rollouts per second of every policy, spread evenly over ``positions``."""
+    results = {}
+    for name, rollout in sorted(ROLLOUTS.items()):
+        rng = random.Random(BENCH_SEED)
+        scratches = [position.copy() for position in positions]
+        each = max(rollouts // len(scratches), 1)
+        start = time.perf_counter()
+        for scratch in scratches:
+            ply = len(scratch.moves)
+            for _ in range(each):
+                rollout(scratch, rng)
+                scratch.rewind(ply)
+        elapsed = time.perf_counter() - start
+        results[f"{name}_per_s"] = round(each * len(scratches) / elapsed, 1)
+    return results
+
+
+def geometry_benchmarks(rollouts):
+    """rollout_benchmarks() on midgame positions of every board size in GEOMETRIES."""
+    results = {}
+    for size in GEOMETRIES:
+        geometry = get_geometry(*size)
+        positions = random_positions(SET_SIZE, plies=MIDGAME_PLIES, geometry=geometry)
+        for name, rate in rollout_benchmarks(positions, rollouts).items():
+            results[f"{geometry.name}_{name}"] = rate
+    return results
+
+
+def import_time(script, directory):
+    """(best import time of ``script`` in ms, LAZY_MODULES it loaded), in fresh interpreters."""
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {script}\n"
+        "print((time.perf_counter() - start) * 1000)\n"
+        f"print(' '.join(name for name in {LAZY_MODULES!r} if name in sys.modules))\n"
+    )
+    best = float("inf")
+    for _ in range(STARTUP_REPEAT):
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=directory, capture_output=True, text=True,
+            check=True,
+        ).stdout.splitlines()
+        best = min(best, float(output[0]))
+    return round(best, 3), output[1].split() if len(output) > 1 else []
+
+
+def startup_benchmarks():
+    """Import time of every STARTUP_SCRIPTS script, and the lazy modules each loaded."""
+    directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    times, loaded = {}, {}
+    for script in STARTUP_SCRIPTS:
+        times[f"{script}_import_ms"], loaded[script] = import_time(script, directory)
+    return times, loaded
+
+
+def startup_problems(results):
+    """Lines describing every import over budget or loading a lazy module."""
+    problems = []
+    for script in STARTUP_SCRIPTS:
+        elapsed = results["startup"][f"{script}_import_ms"]
+        if elapsed > STARTUP_BUDGET_MS:
+            problems.append(f"{script} imports in {elapsed} ms (budget {STARTUP_BUDGET_MS} ms)")
+        for name in results["startup_modules"][script]:
+            problems.append(f"{script} loads {name} at import")
+    return problems
+
+
+# An engine of the benchmark prepares a move, engine(position, rng), and returns the
+# move() that searches it and returns its playouts: only move() is timed, so building
+# the engine and allocating its tables is not counted as search time
+
+
+def spec_engine(spec):
+    """A fresh engine of ``spec`` per move, seeded from the benchmark's stream."""
+    tables = parse_spec(spec)[0] is UCT  # Built by its first search otherwise
+
+    def prepare(position, rng):
+        if tables:
+            engine = make_engine(spec, table=TranspositionTable(), solver=Solver())
+        else:
+            engine = make_engine(spec)
+        seed = rng.getrandbits(SEED_BITS)
+
+        def move():
+            result = engine.search(position, seed=seed)
+            return result.stats.playouts if result.stats is not None else 0
+        return move
+    return prepare
+
+
+def solver_engine():
+    def prepare(position, rng):
+        solver = Solver()
+
+        def move():
+            solver.best_move(position)
+            return 0
+        return move
+    return prepare
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def engine_benchmark(engine, positions):
+    """Latency percentiles, playouts per second and peak memory of ``engine`` per move."""
+    rng = random.Random(BENCH_SEED)
+    latencies = []
+    playouts = 0
+    for position in positions:
+        move = engine(position.copy(), rng)
+        start = time.perf_counter()
+        playouts += move()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    rng.seed(BENCH_SEED)
+    tracemalloc.start()
+    for position in positions:
+        engine(position.copy(), rng)()  # Peak memory includes the tables
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    result = {
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "p50_ms": round(percentile(latencies, 0.5), 3),
+        "p90_ms": round(percentile(latencies, 0.9), 3),
+        "max_ms": round(max(latencies), 3),
+        "peak_kb": round(peak / 1024, 1),
+    }
+    if playouts:
+        result["playouts_per_s"] = round(playouts / (sum(latencies) / 1000), 1)
+    return result
+
+
+def run_benchmarks(directory=".", quick=False):
+    """Run the whole suite and return its results as a JSON-ready dict."""
+    pmcgs_simulations, uct_simulations, rollouts = BUDGETS[quick]
+    sets = benchmark_positions(directory)
+    searched = sets["tests"] + sets["midgame"]
+    everything = searched + sets["endgame"]
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "quick": quick,
+            "positions": {name: len(positions) for name, positions in sets.items()},
+        },
+        "micro": micro_benchmarks(everything, 20 if quick else 200),
+        "rollouts": rollout_benchmarks(everything, rollouts),
+        "geometries": geometry_benchmarks(rollouts),
+        "engines": {},
+    }
+    results["startup"], results["startup_modules"] = startup_benchmarks()
+    engines = {
+        "pmcgs": (spec_engine(f"pmcgs:sims={pmcgs_simulations}"), searched),
+        "uct": (spec_engine(f"uct:sims={uct_simulations}"), searched),
+        "uct_rave": (spec_engine(f"uct:sims={uct_simulations},rave={RAVE_EQUIVALENCE}"), searched),
+        "uct_endgame": (spec_engine(f"uct:sims={uct_simulations}"), sets["endgame"]),
+        "solver_endgame": (solver_engine(), sets["endgame"]),
+    }
+    for name, (engine, positions) in engines.items():
+        results["engines"][name] = engine_benchmark(engine, positions)
+    return results
+
+
+def flatten(results):
+    """{"group.metric": value} for every metric, engines as "engines.name.metric"."""
+    flat = {}
+    for group in ("micro", "rollouts", "geometries", "startup"):
+        for name, value in results.get(group, {}).items():
+            flat[f"{group}.{name}"] = value
+    for engine, metrics in results.get("engines", {}).items():
+        for name, value in metrics.items():
+            flat[f"engines.{engine}.{name}"] = value
+    return flat
+
+
+def compare(results, baseline):
+    """Yield (metric, baseline value, value, relative gain) for the metrics of both runs.
+
+    A positive gain is an improvement, whichever direction that is for the metric.
+    """
+    old = flatten(baseline)
+    for metric, value in flatten(results).items():
+        if metric not in old or not old[metric]:
+            continue
+        change = (value - old[metric]) / old[metric]
+        yield metric, old[metric], value, change if metric.endswith("_per_s") else -change
+
+
+def print_results(results, baseline=None, file=sys.stdout):
+    if baseline is None:
+        for metric, value in flatten(results).items():
+            print(f"{metric:40} {value:>14}", file=file)
+        return
+    for metric, old, value, gain in compare(results, baseline):
+        verdict = ""
+        if gain >= REGRESSION:
+            verdict = "improved"
+        elif gain <= -REGRESSION:
+            verdict = "REGRESSED"
+        print(f"{metric:40} {old:>14} {value:>14} {gain:+8.1%} {verdict}", file=file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Connect Four engines")
+    parser.add_argument("--quick", action="store_true", help="small budgets, for a smoke test")
+    parser.add_argument(
+        "--startup", action="store_true",
+        help="only check the import time of main.py and tournament.py against the budget",
+    )
+    parser.add_argument("--output", metavar="FILE", help="write the results as JSON")
+    parser.add_argument("--baseline", metavar="FILE", help="compare with a saved run")
+    parser.add_argument(
+        "--positions", default=".", metavar="DIR", help="directory holding test1-3.txt"
+    )
+    args = parser.parse_args(argv)
+
+    if args.startup:
+        results = dict(zip(("startup", "startup_modules"), startup_benchmarks()))
+    else:
+        results = run_benchmarks(args.positions, args.quick)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    problems = startup_problems(results)
+    for problem in problems:
+        print(f"STARTUP: {problem}")
+    if baseline is not None:
+        regressions = [gain for *_, gain in compare(results, baseline) if gain <= -REGRESSION]
+        return 1 if regressions or problems else 0
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
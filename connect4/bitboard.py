@@ -0,0 +1,462 @@
+"""Bitboard representation of a Connect Four position.
+
+Every column uses height + 1 bits: the extra bit on top of each column is
+always empty, so shifting a board never carries a piece into the neighbouring
+column.  Bit ``col * stride + row`` (``stride`` = height + 1) is the cell in
+column ``col``, ``row`` counted from the bottom of the board.
+
+The board size and the number in a row needed to win are a Geometry: the
+standard 7x6 connect-four board is STANDARD, whose values are also the module
+constants below, and any width, height and line length can be built with
+get_geometry().  A geometry precomputes its tables once: every winning line
+as a bitmask and, per cell, the lines through it, so that checking the last
+move for a win looks at those few lines whatever the size of the board.
+
+A position and its left-right mirror image have the same value with mirrored
+columns.  Positions carry the Zobrist hash of their mirror image as well, and
+``key`` (the smaller of the two hashes) identifies the pair, so caches keyed on
+it store one entry for both.  The hashes include the side to move: the same
+pieces with the other side to move are another position.
+"""
+
+import functools
+import random
+from bisect import insort
+
+RED = "R"  # Min player
+YELLOW = "Y"  # Max player
+EMPTY = "O"
+PLAYERS = (RED, YELLOW)
+WIN_VALUES = (-1, 1)  # Game value of a win for PLAYERS[i]
+# Random keys per (player, cell); a fixed seed keeps hashes identical across processes
+ZOBRIST_SEED = 20240917
+STANDARD_SIZE = (7, 6, 4)  # Width, height and line length of the standard board
+MAX_SIDE = 64  # Widest and tallest board a Geometry is built for
+
+
+def _four_in_a_row(stride, board_mask):
+    """(has_won, winning_cells) for four in a row, unrolled over the four directions.
+
+    The general checks of Geometry loop over the run length; with the line
+    length fixed at four, these are the fastest checks there are.
+    """
+    def has_won(bits):
+        pairs = bits & (bits >> 1)
+        if pairs & (pairs >> 2):
+            return True
+        pairs = bits & (bits >> stride)
+        if pairs & (pairs >> (2 * stride)):
+            return True
+        pairs = bits & (bits >> (stride - 1))
+        if pairs & (pairs >> (2 * stride - 2)):
+            return True
+        pairs = bits & (bits >> (stride + 1))
+        return bool(pairs & (pairs >> (2 * stride + 2)))
+
+    def winning_cells(bits):
+        cells = (bits << 1) & (bits << 2) & (bits << 3)  # Only upwards is possible vertically
+        for shift in (stride, stride - 1, stride + 1):
+            pairs = (bits << shift) & (bits << (2 * shift))
+            cells |= pairs & (bits << (3 * shift))
+            cells |= pairs & (bits >> shift)
+            pairs = (bits >> shift) & (bits >> (2 * shift))
+            cells |= pairs & (bits << shift)
+            cells |= pairs & (bits >> (3 * shift))
+        return cells & board_mask
+
+    return has_won, winning_cells
+
+
+class Geometry:
+    """Board width and height, the length of a winning line, and tables derived from them.
+
+    Geometries are immutable and shared: get one from get_geometry(), which
+    builds the tables of each size once per process.
+    """
+
+    __slots__ = (
+        "width", "height", "connect", "stride", "cells", "bottom_mask", "board_mask",
+        "top_cells", "shifts", "lines", "cell_lines", "zobrist", "mirror_zobrist", "side_key",
+        "centre_order", "centre_bag", "has_won", "winning_cells",
+    )
+
+    def __init__(self, width, height, connect):
+        if not (0 < width <= MAX_SIDE and 0 < height <= MAX_SIDE) or not (
+            2 <= connect <= max(width, height)
+        ):
+            raise ValueError(f"No {width}x{height} board with {connect} in a row")
+        self.width = width
+        self.height = height
+        self.connect = connect
+        self.stride = stride = height + 1  # Bits per column, one spare on top
+        self.cells = width * height
+        self.bottom_mask = sum(1 << (col * stride) for col in range(width))
+        self.board_mask = self.bottom_mask * ((1 << height) - 1)
+        self.top_cells = tuple(col * stride + height for col in range(width))
+        # Vertical, horizontal and the two diagonal directions
+        self.shifts = (1, stride, stride - 1, stride + 1)
+
+        lines = []
+        cell_lines = [[] for _ in range(width * stride)]
+        for col in range(width):
+            for row in range(height):
+                for step_col, step_row in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_col = col + step_col * (connect - 1)
+                    end_row = row + step_row * (connect - 1)
+                    if end_col < width and 0 <= end_row < height:
+                        cells = [
+                            (col + k * step_col) * stride + row + k * step_row
+                            for k in range(connect)
+                        ]
+                        line = sum(1 << cell for cell in cells)
+                        lines.append(line)
+                        for cell in cells:
+                            cell_lines[cell].append(line)
+        self.lines = tuple(lines)
+        self.cell_lines = tuple(tuple(per_cell) for per_cell in cell_lines)
+
+        # Other sizes and line lengths draw from their own stream, so that no position
+        # shares its hash with a position under other rules
+        if (width, height, connect) == STANDARD_SIZE:
+            rng = random.Random(ZOBRIST_SEED)
+        else:
+            rng = random.Random(f"{ZOBRIST_SEED}:{width}x{height}c{connect}")
+        self.zobrist = tuple(
+            tuple(rng.getrandbits(64) for _ in range(width * stride)) for _ in PLAYERS
+        )
+        # Mixed into the hash of positions whose side to move is not the one that
+        # moves first from the empty board (RED) after as many pieces as they hold
+        self.side_key = rng.getrandbits(64)
+        # The same keys indexed by the mirrored cell: the mirror image's hash, updated alongside
+        mirror_cells = [
+            (width - 1 - cell // stride) * stride + cell % stride for cell in range(width * stride)
+        ]
+        self.mirror_zobrist = tuple(
+            tuple(keys[cell] for cell in mirror_cells) for keys in self.zobrist
+        )
+
+        self.centre_order = tuple(sorted(range(width), key=lambda col: abs(2 * col - (width - 1))))
+        # Columns weighted by how many horizontal lines pass through them (1-2-3-4-3-2-1)
+        self.centre_bag = tuple(
+            col
+            for col in range(width)
+            for _ in range(min(col + 1, connect, width - col, max(width - connect + 1, 1)))
+        )
+
+        # has_won(bits) and winning_cells(bits): the unrolled checks for four in a row,
+        # else has_line() and line_cells()
+        if connect == 4:
+            self.has_won, self.winning_cells = _four_in_a_row(stride, self.board_mask)
+        else:
+            self.has_won, self.winning_cells = self.has_line, self.line_cells
+
+    def __repr__(self):
+        return f"get_geometry({self.width}, {self.height}, {self.connect})"
+
+    def __eq__(self, other):
+        if not isinstance(other, Geometry):
+            return NotImplemented
+        return (self.width, self.height, self.connect) == (
+            other.width, other.height, other.connect
+        )
+
+    def __hash__(self):
+        return hash((self.width, self.height, self.connect))
+
+    def __reduce__(self):
+        # Pickled by size only: a worker process builds (or reuses) its own tables
+        return get_geometry, (self.width, self.height, self.connect)
+
+    @property
+    def name(self):
+        """"7x6", or "9x7c5" when the line length is not 4."""
+        suffix = f"c{self.connect}" if self.connect != 4 else ""
+        return f"{self.width}x{self.height}{suffix}"
+
+    def mirror_column(self, col):
+        """The column ``col`` becomes in the left-right mirror image."""
+        return self.width - 1 - col
+
+    def has_line(self, bits):
+        """Return True if the bitboard contains ``connect`` in a row anywhere."""
+        connect = self.connect
+        for shift in self.shifts:
+            # Double the run length covered by each AND, then top up to ``connect``
+            run, length = bits, 1
+            while 2 * length <= connect:
+                run &= run >> (length * shift)
+                length *= 2
+            if length < connect:
+                run &= run >> ((connect - length) * shift)
+            if run:
+                return True
+        return False
+
+    def line_cells(self, bits):
+        """Bitboard of the cells that would complete a line for ``bits``.
+
+        Occupied cells are included; mask them out to get the playable threats.
+        """
+        span = self.connect - 1
+        cells = bits << 1  # Only upwards is possible vertically
+        for k in range(2, span + 1):
+            cells &= bits << k
+        for shift in self.shifts[1:]:
+            # below[k]: the k cells on one side are ours; above[k] likewise on the other
+            below, above = [-1], [-1]
+            for k in range(1, span + 1):
+                below.append(below[-1] & (bits << (k * shift)))
+                above.append(above[-1] & (bits >> (k * shift)))
+            for k in range(span + 1):
+                cells |= below[k] & above[span - k]
+        return cells & self.board_mask
+
+
+def get_geometry(width=7, height=6, connect=4):
+    """The shared Geometry of a ``width`` x ``height`` board with ``connect`` in a row."""
+    # Cached by the full size, however it was passed: one object per geometry
+    return _build_geometry(width, height, connect)
+
+
+@functools.lru_cache(maxsize=None)
+def _build_geometry(width, height, connect):
+    return Geometry(width, height, connect)
+
+
+STANDARD = get_geometry()
+
+# The standard board's values, for code that only plays on it
+ROWS = STANDARD.height
+COLUMNS = STANDARD.width
+HEIGHT = STANDARD.stride
+BOTTOM_MASK = STANDARD.bottom_mask
+BOARD_MASK = STANDARD.board_mask
+TOP_CELLS = STANDARD.top_cells  # First bit above each column
+ZOBRIST = STANDARD.zobrist
+MIRROR_ZOBRIST = STANDARD.mirror_zobrist
+SHIFTS = STANDARD.shifts
+
+
+def mirror_column(col):
+    """The column ``col`` becomes in the left-right mirror image of the standard board."""
+    return COLUMNS - 1 - col
+
+
+def mirror_columns(values):
+    """Reverse a per-column list: its values for the mirror image."""
+    return values[::-1]
+
+
+# The standard board's win checks (Geometry.has_won and Geometry.winning_cells)
+has_four = STANDARD.has_won
+winning_cells = STANDARD.winning_cells
+
+
+class Position:
+    """Two player bitboards, per-column heights, the move history and a Zobrist hash.
+
+    play() and undo() keep the heights, the list of open columns and the hash
+    up to date, so a search can play a whole rollout on one position and
+    rewind() it afterwards instead of copying the board for every simulation.
+    """
+
+    __slots__ = (
+        "geometry", "boards", "heights", "legal", "moves", "turn", "hash", "mirror_hash",
+        "_threats",
+    )
+
+    def __init__(self, turn=0, geometry=STANDARD):
+        self.geometry = geometry
+        self.boards = [0, 0]  # Pieces of PLAYERS[0] and PLAYERS[1]
+        self.heights = [col * geometry.stride for col in range(geometry.width)]  # Next free bit
+        self.legal = list(range(geometry.width))  # Open columns, in ascending order
+        self.moves = []
+        self.turn = turn  # Index into PLAYERS of the side to move
+        # XOR of ZOBRIST keys of every piece on the board, and the geometry's side_key
+        # when the side to move is not RED after an even number of pieces (a parity
+        # moves leave unchanged)
+        self.hash = geometry.side_key if turn else 0
+        self.mirror_hash = self.hash  # The same for the mirror image
+        # Per player: (board the threats were computed for, winning_cells of it)
+        self._threats = [(0, 0), (0, 0)]
+
+    @classmethod
+    def from_rows(cls, board, player, connect=4):
+        """Build a position from the text board format (top row first).
+
+        The board size is that of ``board``; ``connect`` is the line length to win.
+        """
+        rows, columns = len(board), len(board[0]) if board else 0
+        if any(len(row) != columns for row in board):
+            raise ValueError("Board rows differ in length")
+        geometry = get_geometry(columns, rows, connect)
+        position = cls(PLAYERS.index(player), geometry)
+        for col in range(columns):
+            for row in range(rows):
+                piece = board[rows - 1 - row][col]
+                if piece == EMPTY:
+                    break
+                index = PLAYERS.index(piece)
+                position.boards[index] |= 1 << position.heights[col]
+                position.hash ^= geometry.zobrist[index][position.heights[col]]
+                position.mirror_hash ^= geometry.mirror_zobrist[index][position.heights[col]]
+                position.heights[col] += 1
+                position.hash ^= geometry.side_key  # Each piece flips the parity
+                position.mirror_hash ^= geometry.side_key
+        position.legal = [col for col in range(columns) if position.can_play(col)]
+        return position
+
+    def to_rows(self):
+        """Return the position in the text board format (top row first)."""
+        geometry = self.geometry
+        rows, columns = geometry.height, geometry.width
+        board = [[EMPTY] * columns for _ in range(rows)]
+        for index, bits in enumerate(self.boards):
+            for col in range(columns):
+                for row in range(rows):
+                    if bits >> (col * geometry.stride + row) & 1:
+                        board[rows - 1 - row][col] = PLAYERS[index]
+        return board
+
+    def copy(self):
+        position = Position(self.turn, self.geometry)
+        position.boards = self.boards[:]
+        position.heights = self.heights[:]
+        position.legal = self.legal[:]
+        position.moves = self.moves[:]
+        position.hash = self.hash
+        position.mirror_hash = self.mirror_hash
+        position._threats = self._threats[:]
+        return position
+
+    @property
+    def player(self):
+        """The token of the side to move."""
+        return PLAYERS[self.turn]
+
+    @property
+    def mask(self):
+        """Bitboard of all occupied cells."""
+        return self.boards[0] | self.boards[1]
+
+    @property
+    def key(self):
+        """Hash shared by the position and its mirror image."""
+        return min(self.hash, self.mirror_hash)
+
+    @property
+    def mirrored(self):
+        """True if ``key`` is the mirror image's hash: cached per-column data is reversed."""
+        return self.mirror_hash < self.hash
+
+    def is_symmetric(self):
+        return self.hash == self.mirror_hash
+
+    def distinct_moves(self):
+        """Open columns, without the mirror duplicates of a symmetric position."""
+        if self.hash == self.mirror_hash:
+            last = self.geometry.width - 1
+            return [col for col in self.legal if col <= last - col]
+        return self.legal
+
+    def can_play(self, col):
+        return self.heights[col] < self.geometry.top_cells[col]
+
+    def legal_moves(self):
+        """The open columns; the list is owned by the position, do not modify it."""
+        return self.legal
+
+    def legal_mask(self):
+        """Bitboard of the cells a piece would land on in each open column."""
+        geometry = self.geometry
+        return (self.mask + geometry.bottom_mask) & geometry.board_mask
+
+    def threats(self, index):
+        """Empty cells where PLAYERS[index] would complete a line.
+
+        Only the side whose pieces changed since the last call is recomputed.
+        """
+        bits = self.boards[index]
+        cached_bits, cells = self._threats[index]
+        if cached_bits != bits:
+            cells = self.geometry.winning_cells(bits)
+            self._threats[index] = (bits, cells)
+        return cells & ~(self.boards[0] | self.boards[1])
+
+    def threat_count(self, index):
+        return self.threats(index).bit_count()
+
+    def play(self, col):
+        """Drop a piece for the side to move into ``col``."""
+        geometry = self.geometry
+        turn = self.turn
+        cell = self.heights[col]
+        self.boards[turn] |= 1 << cell
+        self.hash ^= geometry.zobrist[turn][cell]
+        self.mirror_hash ^= geometry.mirror_zobrist[turn][cell]
+        self.heights[col] = cell + 1
+        if cell + 1 == geometry.top_cells[col]:
+            self.legal.remove(col)
+        self.moves.append(col)
+        self.turn = turn ^ 1
+
+    def undo(self):
+        """Take back the last move made with play()."""
+        geometry = self.geometry
+        col = self.moves.pop()
+        cell = self.heights[col] - 1
+        if cell + 1 == geometry.top_cells[col]:
+            insort(self.legal, col)
+        self.heights[col] = cell
+        self.turn = turn = self.turn ^ 1
+        self.boards[turn] ^= 1 << cell
+        self.hash ^= geometry.zobrist[turn][cell]
+        self.mirror_hash ^= geometry.mirror_zobrist[turn][cell]
+
+    def rewind(self, ply):
+        """Undo moves until only the first ``ply`` moves of the history remain."""
+        while len(self.moves) > ply:
+            self.undo()
+
+    def child_hash(self, col):
+        """Hash of the position after the side to move plays ``col``."""
+        return self.hash ^ self.geometry.zobrist[self.turn][self.heights[col]]
+
+    def child_key(self, col):
+        """``key`` of the position after the side to move plays ``col``."""
+        geometry = self.geometry
+        cell = self.heights[col]
+        return min(
+            self.hash ^ geometry.zobrist[self.turn][cell],
+            self.mirror_hash ^ geometry.mirror_zobrist[self.turn][cell],
+        )
+
+    def last_move_won(self):
+        """Return True if the side that just moved has completed a line.
+
+        Only the lines through the last move's cell are looked at; a position
+        built from rows, without a history, is checked in full.
+        """
+        bits = self.boards[self.turn ^ 1]
+        if not self.moves:
+            return self.geometry.has_won(bits)
+        for line in self.geometry.cell_lines[self.heights[self.moves[-1]] - 1]:
+            if bits & line == line:
+                return True
+        return False
+
+    def is_full(self):
+        return not self.legal
+
+    def empty_cells(self):
+        return self.geometry.cells - (self.boards[0] | self.boards[1]).bit_count()
+
+    def result(self):
+        """Return 1 if YELLOW won, -1 if RED won, 0 for a draw, None otherwise."""
+        has_won = self.geometry.has_won
+        for index in (self.turn ^ 1, self.turn):
+            if has_won(self.boards[index]):
+                return WIN_VALUES[index]
+        if self.is_full():
+            return 0
+        return None
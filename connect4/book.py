@@ -0,0 +1,206 @@
+"""Opening book: precomputed search results for the first plies of the game.
+
+Every game of a tournament starts from the same few positions, and searching
+them again in every game is the most repeated work there is.  The book is
+built offline by running a deep UCT search (with the endgame solver at its
+leaves) on every position up to a given number of plies:
+
+    python -m connect4.book --plies 4 --simulations 20000 --output opening_book.bin
+
+The file is a header followed by fixed-size records sorted by position key.
+It is memory-mapped read-only and searched by bisection, so opening a book
+costs nothing beyond the mmap and lookups touch only a few pages.  Records are
+keyed by ``Position.key``: a position and its mirror image share one record,
+stored in the orientation whose hash is the key and mirrored back on lookup.
+The key includes the side to move, so the same pieces with the other side to
+move (possible in an input file) are not found.
+Books cover the standard 7x6 board; other geometries are never found in one.
+"""
+
+import argparse
+import mmap
+import random
+import struct
+
+from connect4.bitboard import (
+    COLUMNS, STANDARD, WIN_VALUES, ZOBRIST_SEED, Position, mirror_column, mirror_columns,
+)
+from connect4.mcts import UCTSearch
+from connect4.parallel import get_pool
+from connect4.rollouts import ROLLOUTS, random_rollout
+from connect4.solver import SOLVE_BELOW, Solver
+from connect4.transposition import TranspositionTable
+
+BOOK_PATH = "opening_book.bin"  # Used by main.py when present
+MAGIC = b"C4BOOK02"
+HEADER = struct.Struct("<8sQ")  # Magic, Zobrist seed the keys were made with
+# Key, best move, per-column value for the side to move (scaled; NO_VALUE: none)
+RECORD = struct.Struct("<Qb7h")
+KEY = struct.Struct("<Q")
+VALUE_SCALE = 10000
+NO_VALUE = -32768
+
+_books = {}  # Path -> OpeningBook, opened once per process
+
+
+class OpeningBook:
+    """Read-only view of a book file."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, seed = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or seed != ZOBRIST_SEED:
+            self.map.close()
+            raise ValueError(f"{path} is not an opening book for this version")
+        self.count = (len(self.map) - HEADER.size) // RECORD.size
+
+    def __len__(self):
+        return self.count
+
+    def lookup(self, key):
+        """Return (best move, column values) stored for ``key``, or None.
+
+        Values are from the side to move's point of view, None for full columns
+        and for columns the search never visited.
+        """
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = HEADER.size + mid * RECORD.size
+            mid_key = KEY.unpack_from(self.map, offset)[0]
+            if mid_key < key:
+                lo = mid + 1
+            elif mid_key > key:
+                hi = mid
+            else:
+                _, move, *scaled = RECORD.unpack_from(self.map, offset)
+                values = [None if value == NO_VALUE else value / VALUE_SCALE for value in scaled]
+                return move, values
+        return None
+
+    def probe(self, position):
+        """lookup() for ``position``, in its own column orientation."""
+        if position.geometry != STANDARD:
+            return None
+        entry = self.lookup(position.key)
+        if entry is None or not position.mirrored:
+            return entry
+        move, values = entry
+        return mirror_column(move), mirror_columns(values)
+
+    def close(self):
+        self.map.close()
+
+
+def load_book(path):
+    """Open the book at ``path`` once per process; None if there is no such file."""
+    if path not in _books:
+        try:
+            _books[path] = OpeningBook(path)
+        except FileNotFoundError:
+            _books[path] = None
+    return _books[path]
+
+
+def write_book(path, entries):
+    """Write ``entries`` ({key: (move, values)}) as a sorted book file."""
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, ZOBRIST_SEED))
+        for key in sorted(entries):
+            move, values = entries[key]
+            scaled = [
+                NO_VALUE if value is None else round(value * VALUE_SCALE) for value in values
+            ]
+            file.write(RECORD.pack(key, move, *scaled))
+
+
+def opening_positions(plies):
+    """Every non-terminal position up to ``plies`` moves, one per mirror pair."""
+    seen = set()
+    frontier = [Position()]
+    positions = []
+    for depth in range(plies + 1):
+        following = []
+        for position in frontier:
+            if position.key in seen or position.result() is not None:
+                continue
+            seen.add(position.key)
+            positions.append(position)
+            if depth < plies:
+                for col in position.distinct_moves():
+                    child = position.copy()
+                    child.play(col)
+                    following.append(child)
+        frontier = following
+    return positions
+
+
+def evaluate(position, simulations, seed, rollout=random_rollout, solve_below=SOLVE_BELOW):
+    """Search ``position`` and return (key, (best move, column values)).
+
+    The entry is in the orientation of the key, like the records of the book.
+    Every position gets a fresh search and tables, so an entry depends only on
+    its position and seed, not on which positions a worker searched before.
+    """
+    search = UCTSearch(
+        rollout, table=TranspositionTable(), solver=Solver(), solve_below=solve_below,
+        rng=random.Random(seed),
+    )
+    move = search.search(position, simulations)
+    wi, ni = search.root_statistics()
+    sign = WIN_VALUES[position.turn]
+    # None for full columns, and for open ones never visited (the root was proven first)
+    values = [sign * wi[col] / ni[col] if ni[col] else None for col in range(COLUMNS)]
+    if position.mirrored:
+        move, values = mirror_column(move), mirror_columns(values)
+    return position.key, (move, values)
+
+
+def build_book(plies, simulations, seed=None, workers=1, rollout=random_rollout,
+               solve_below=SOLVE_BELOW, verbose=False):
+    """Search every opening position up to ``plies`` and return the book entries."""
+    positions = opening_positions(plies)
+    rng = random.Random(seed)
+    seeds = [rng.getrandbits(64) for _ in positions]
+    count = len(positions)
+    args = (
+        positions, [simulations] * count, seeds, [rollout] * count, [solve_below] * count
+    )
+    if workers > 1:
+        results = get_pool(workers).map(evaluate, *args, chunksize=16)
+    else:
+        results = map(evaluate, *args)
+
+    entries = {}
+    for done, (key, entry) in enumerate(results, 1):
+        entries[key] = entry
+        if verbose and done % 100 == 0:
+            print(f"{done}/{count} positions")
+    return entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a Connect Four opening book")
+    parser.add_argument("--plies", type=int, default=4, help="deepest ply in the book")
+    parser.add_argument(
+        "--simulations", type=int, default=20000, help="UCT iterations per position"
+    )
+    parser.add_argument("--output", default=BOOK_PATH, help="book file to write")
+    parser.add_argument("--workers", type=int, default=1, help="positions searched in parallel")
+    parser.add_argument("--rollout", choices=sorted(ROLLOUTS), default="random")
+    parser.add_argument("--solve-below", type=int, default=SOLVE_BELOW, metavar="N")
+    parser.add_argument("--seed", type=int, help="seed for a reproducible book")
+    args = parser.parse_args(argv)
+
+    entries = build_book(
+        args.plies, args.simulations, args.seed, args.workers, ROLLOUTS[args.rollout],
+        args.solve_below, verbose=True,
+    )
+    write_book(args.output, entries)
+    print(f"Wrote {len(entries)} positions to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+"""Engines: every move-choosing algorithm behind one interface.
+
+An engine is configured once, from keyword arguments or a spec string such
+as ``uct:sims=10000,c=1.41``, and then asked for one move at a time:
+
+    engine = make_engine("uct:sims=2000,rollout=heavy")
+    result = engine.search(position)  # The engine's own budget
+    result = engine.search(position, Budget(movetime=500))
+
+search() returns a SearchResult: the chosen column, the per-column values in
+YELLOW's view (None for full or unsearched columns) and the SearchStats of the
+search, which are None when the opening book or the endgame solver answered.
+An engine keeps what it can reuse between the moves of a game (the UCT tree)
+and its own random generator; reset() forgets the former, and a ``seed``
+given to search() reseeds the latter for a reproducible move.
+
+The command line, the batch mode, the move server and both tournaments play
+through these engines, so every algorithm has exactly one implementation.
+"""
+
+import functools
+import random
+
+from connect4.bitboard import WIN_VALUES
+from connect4.book import load_book
+from connect4.mcts import EXPLORATION, UCTSearch, deadline_after, pmcgs_statistics
+from connect4.parallel import merged_move, pmcgs_worker, root_parallel, uct_worker
+from connect4.rollouts import ROLLOUTS, random_rollout
+from connect4.seeding import SEED_BITS
+from connect4.solver import SOLVE_BELOW, Solver
+from connect4.stats import SAMPLE_EVERY, SearchStats
+from connect4.transposition import TranspositionTable
+
+
+class Budget:
+    """How long one search may run: simulations, a move time in ms, or both.
+
+    With both, the search stops at whichever limit it reaches first.
+    """
+
+    __slots__ = ("simulations", "movetime")
+
+    def __init__(self, simulations=None, movetime=None):
+        self.simulations = simulations
+        self.movetime = movetime
+
+    def __bool__(self):
+        return self.simulations is not None or self.movetime is not None
+
+    def __repr__(self):
+        return f"Budget(simulations={self.simulations}, movetime={self.movetime})"
+
+
+class SearchResult:
+    """The move an engine chose, its per-column values and its statistics."""
+
+    __slots__ = ("move", "values", "stats")
+
+    def __init__(self, move, values, stats=None):
+        self.move = move  # 0-based column
+        self.values = values  # YELLOW's view; None for full or unsearched columns
+        self.stats = stats  # SearchStats, or None if the book or the solver answered
+
+    def __repr__(self):
+        return f"SearchResult(move={self.move}, values={self.values})"
+
+
+def column_values(wi, ni):
+    """Per-column wi/ni, None where a column was never sampled."""
+    return [wi[col] / ni[col] if ni[col] > 0 else None for col in range(len(wi))]
+
+
+def yellow_values(position, values):
+    """Per-column values for the side to move, turned into YELLOW's view."""
+    sign = WIN_VALUES[position.turn]
+    return [None if value is None else sign * value for value in values]
+
+
+def book_move(position, book):
+    """The opening book's SearchResult for ``position``, or None if it is not in the book."""
+    entry = book.probe(position) if book is not None else None
+    if entry is None:
+        return None
+    move, values = entry
+    return SearchResult(move, yellow_values(position, values))
+
+
+def is_endgame(position, solve_below):
+    """True once ``position`` is small enough to solve exactly (solve_below None: never)."""
+    return solve_below is not None and position.empty_cells() <= solve_below
+
+
+def solve_endgame(position, solver=None):
+    """Solve every column exactly: values are 1, 0 or -1, in YELLOW's view."""
+    if solver is None:
+        solver = Solver()
+    values = solver.column_values(position)
+    # Among equally good columns, prefer the most central one
+    move = max(
+        (col for col in position.geometry.centre_order if values[col] is not None),
+        key=values.__getitem__,
+    )
+    return SearchResult(move, yellow_values(position, values))
+
+
+def new_search(rollout=random_rollout, solve_below=SOLVE_BELOW, table=None, solver=None,
+               rng=None, exploration=EXPLORATION, rave=None, fpu=None):
+    """A UCT tree with a transposition table and an endgame solver (new ones by default)."""
+    if table is None:
+        table = TranspositionTable()
+    if solver is None and solve_below is not None:
+        solver = Solver()
+    return UCTSearch(rollout, exploration, table, solver, solve_below, rng, rave, fpu)
+
+
+def parse_bool(text):
+    if text.lower() in ("1", "true", "yes", "on"):
+        return True
+    if text.lower() in ("0", "false", "no", "off"):
+        return False
+    raise ValueError(f"Not a boolean: {text}")
+
+
+def parse_solve_below(text):
+    """An empty-cell count; a negative one disables the solver."""
+    value = int(text)
+    return value if value >= 0 else None
+
+
+class Engine:
+    """A configured algorithm that picks moves; subclasses implement search().
+
+    ``OPTIONS`` maps the keys of a spec string to (constructor argument,
+    converter from text).
+    """
+
+    name = None
+    OPTIONS = {
+        "sims": ("simulations", int),
+        "ms": ("movetime", int),
+        "seed": ("seed", int),
+    }
+
+    def __init__(self, simulations=None, movetime=None, seed=None):
+        self.budget = Budget(simulations, movetime)
+        self.rng = random.Random(seed)
+
+    def search(self, position, budget=None, seed=None, callback=None, every=SAMPLE_EVERY):
+        """Choose a move at ``position`` and return a SearchResult.
+
+        ``budget`` replaces the engine's own for this search.  The searching
+        engines call ``callback(stats, wi, ni)`` every ``every`` iterations.
+        """
+        raise NotImplementedError
+
+    def reset(self):
+        """Forget what was kept from earlier moves, before a new game."""
+
+    def resolve(self, budget, seed):
+        """The budget of this search, after reseeding the generator with ``seed``."""
+        if seed is not None:
+            self.rng.seed(seed)
+        budget = budget if budget is not None else self.budget
+        if not budget:
+            raise ValueError(f"{self.name} needs simulations or a movetime")
+        return budget
+
+
+class UniformRandom(Engine):
+    """A uniformly random legal move; no budget needed."""
+
+    name = "ur"
+
+    def search(self, position, budget=None, seed=None, callback=None, every=SAMPLE_EVERY):
+        if seed is not None:
+            self.rng.seed(seed)
+        moves = position.legal_moves()
+        if not moves:
+            raise ValueError("No valid moves available")
+        return SearchResult(self.rng.choice(moves), [None] * position.geometry.width)
+
+
+class PMCGS(Engine):
+    """Pure Monte Carlo game search: ``simulations`` rollouts per column.
+
+    Positions with at most ``solve_below`` empty cells are solved instead
+    (None: never) and positions in the opening ``book`` are not searched.
+    With several ``workers`` the rollouts are split across processes; the
+    ``vectorized`` mode plays the rollouts of a column as one NumPy batch
+    (random rollouts only).
+    """
+
+    name = "pmcgs"
+    OPTIONS = {
+        **Engine.OPTIONS,
+        "rollout": ("rollout", str),
+        "solve": ("solve_below", parse_solve_below),
+        "workers": ("workers", int),
+        "vectorized": ("vectorized", parse_bool),
+        "book": ("book", load_book),
+    }
+
+    def __init__(self, simulations=None, movetime=None, seed=None, rollout="random",
+                 solve_below=SOLVE_BELOW, workers=1, vectorized=False, book=None):
+        super().__init__(simulations, movetime, seed)
+        if rollout not in ROLLOUTS:
+            raise ValueError(f"Unknown rollout: {rollout}")
+        self.rollout = ROLLOUTS[rollout]
+        self.solve_below = solve_below
+        self.workers = workers
+        self.vectorized = vectorized
+        self.book = book
+
+    def search(self, position, budget=None, seed=None, callback=None, every=SAMPLE_EVERY):
+        budget = self.resolve(budget, seed)
+        answer = book_move(position, self.book)
+        if answer is not None:
+            return answer
+        if is_endgame(position, self.solve_below):
+            return solve_endgame(position)
+        deadline = deadline_after(budget.movetime)
+        simulations = budget.simulations
+        if self.vectorized:
+            from connect4.batch_rollout import pmcgs_batch_statistics  # Needs numpy
+
+            stats = SearchStats()
+            wi, ni = pmcgs_batch_statistics(
+                position, simulations, self.rng.getrandbits(SEED_BITS), deadline
+            )
+            stats.playouts = sum(ni)
+            stats.rollout_time = stats.finish().elapsed
+        elif self.workers > 1:
+            wi, ni, stats, _ = root_parallel(
+                pmcgs_worker, position, simulations, self.workers,
+                self.rng.getrandbits(SEED_BITS), deadline, self.rollout,
+            )
+        else:
+            stats = SearchStats()
+            wi, ni = pmcgs_statistics(
+                position, simulations, self.rollout, self.rng, deadline, stats, callback, every
+            )
+
+        # The best wi/ni value for the side to move, ignoring full columns
+        values = column_values(wi, ni)
+        sign = WIN_VALUES[position.turn]
+        move = max(
+            range(len(values)),
+            key=lambda col: sign * values[col] if values[col] is not None else float("-inf"),
+        )
+        return SearchResult(move, values, stats)
+
+
+class UCT(Engine):
+    """Upper Confidence bounds applied to Trees, with exploration constant ``exploration``.
+
+    A single-process engine keeps its tree between moves and re-roots it at
+    the moves played since its last search; a shared ``table`` and ``solver``
+    can be passed in.  With several ``workers``, either independent trees are
+    grown and their root statistics summed (``parallel`` "root") or all
+    workers grow one shared tree ("tree"); those trees are not kept.  The
+    solver and the book work as for PMCGS.  ``rave`` (the equivalence
+    parameter k, None or 0: off) and ``fpu`` (first-play urgency) are passed
+    to UCTSearch; the shared tree supports neither.
+    """
+
+    name = "uct"
+    OPTIONS = {
+        **Engine.OPTIONS,
+        "c": ("exploration", float),
+        "rollout": ("rollout", str),
+        "solve": ("solve_below", parse_solve_below),
+        "workers": ("workers", int),
+        "parallel": ("parallel", str),
+        "rave": ("rave", float),
+        "fpu": ("fpu", float),
+        "book": ("book", load_book),
+    }
+
+    def __init__(self, simulations=None, movetime=None, seed=None, exploration=EXPLORATION,
+                 rollout="random", solve_below=SOLVE_BELOW, workers=1, parallel="root",
+                 rave=None, fpu=None, book=None, table=None, solver=None):
+        super().__init__(simulations, movetime, seed)
+        if rollout not in ROLLOUTS:
+            raise ValueError(f"Unknown rollout: {rollout}")
+        if parallel not in ("root", "tree"):
+            raise ValueError(f"Unknown parallel mode: {parallel}")
+        if workers > 1 and parallel == "tree" and (rave or fpu is not None):
+            raise ValueError("The shared tree (parallel=tree) supports neither rave nor fpu")
+        self.exploration = exploration
+        self.rollout = ROLLOUTS[rollout]
+        self.solve_below = solve_below
+        self.workers = workers
+        self.parallel = parallel
+        self.rave = rave
+        self.fpu = fpu
+        self.book = book
+        self.table = table
+        self.solver = solver
+        self.tree = None  # UCTSearch of the single-process engine, created on first use
+
+    def reset(self):
+        self.tree = None
+
+    def search(self, position, budget=None, seed=None, callback=None, every=SAMPLE_EVERY):
+        budget = self.resolve(budget, seed)
+        answer = book_move(position, self.book)
+        if answer is not None:
+            return answer
+        if is_endgame(position, self.solve_below):
+            return solve_endgame(position, self.tree.solver if self.tree else self.solver)
+        deadline = deadline_after(budget.movetime)
+        simulations = budget.simulations
+        if self.workers > 1 and self.parallel == "tree":
+            from connect4.tree_parallel import tree_parallel_search  # Shared memory
+
+            move, wi, ni, stats = tree_parallel_search(
+                position, simulations, self.workers, self.rng.getrandbits(SEED_BITS),
+                self.exploration, deadline, self.rollout,
+            )
+        elif self.workers > 1:
+            worker = functools.partial(
+                uct_worker, exploration=self.exploration, rave=self.rave, fpu=self.fpu
+            )
+            wi, ni, stats, proofs = root_parallel(
+                worker, position, simulations, self.workers, self.rng.getrandbits(SEED_BITS),
+                deadline, self.rollout,
+            )
+            move = merged_move(ni, proofs)
+        else:
+            if self.tree is None:
+                self.tree = new_search(
+                    self.rollout, self.solve_below, self.table, self.solver, self.rng,
+                    self.exploration, self.rave, self.fpu,
+                )
+            move = self.tree.search(position, simulations, deadline, callback, every)
+            wi, ni = self.tree.root_statistics()
+            stats = self.tree.stats
+        return SearchResult(move, column_values(wi, ni), stats)
+
+
+ENGINES = {engine.name: engine for engine in (UniformRandom, PMCGS, UCT)}
+
+
+def parse_spec(spec):
+    """(engine class, constructor arguments) of a spec such as "uct:sims=10000,c=1.41".
+
+    Engine names are case-insensitive; ValueError for an unknown engine or option.
+    """
+    name, _, options = spec.partition(":")
+    engine = ENGINES.get(name.strip().lower())
+    if engine is None:
+        raise ValueError(f"Unknown engine: {name} (one of {', '.join(ENGINES)})")
+    arguments = {}
+    for option in filter(None, (option.strip() for option in options.split(","))):
+        key, separator, value = option.partition("=")
+        if not separator or key.strip() not in engine.OPTIONS:
+            raise ValueError(
+                f"Unknown option for {engine.name}: {option} "
+                f"(one of {', '.join(key + '=' for key in engine.OPTIONS)})"
+            )
+        argument, convert = engine.OPTIONS[key.strip()]
+        arguments[argument] = convert(value.strip())
+    return engine, arguments
+
+
+def make_engine(spec, **defaults):
+    """Build the engine ``spec`` describes.
+
+    ``defaults`` are constructor arguments for whatever the spec leaves out;
+    those the engine does not take are ignored, so one set of command-line
+    options can configure any engine.
+    """
+    engine, arguments = parse_spec(spec)
+    # The constructor's argument names, read from its code object: the inspect module
+    # would cost more start-up time than the rest of this module
+    code = engine.__init__.__code__
+    accepted = code.co_varnames[1:code.co_argcount]
+    for argument, value in defaults.items():
+        if argument in accepted:
+            arguments.setdefault(argument, value)
+    return engine(**arguments)
@@ -0,0 +1,106 @@
+"""Tournament results table and its heatmap, rendered without a display.
+
+    python -m connect4.heatmap tournament_results.json [--output heatmap.png]
+
+tournament.py writes its results as a small JSON table: the players and,
+for every pair, the games the first won against the second with either
+colour, the draws and the games played.  Rendering is a separate step, so a
+tournament (and every worker process it starts) never loads matplotlib, and
+the image can be drawn later or on another machine.  matplotlib is imported
+only here, with the non-interactive Agg backend, so no GUI is needed; the
+file extension (.png, .svg, .pdf) chooses the format.
+"""
+
+import argparse
+import json
+import os
+
+
+def write_table(path, seed, geometry, players, wins, draws):
+    """Write the results table of a tournament to ``path``."""
+    size = len(players)
+    games = [
+        [wins[i][j] + wins[j][i] + draws[i][j] if i != j else 0 for j in range(size)]
+        for i in range(size)
+    ]
+    table = {
+        "seed": seed,
+        "board": geometry.name,
+        "players": players,
+        "wins": wins,
+        "draws": draws,
+        "games": games,
+    }
+    with open(path, "w") as file:
+        json.dump(table, file, indent=1)
+
+
+def read_table(path):
+    with open(path, "r") as file:
+        return json.load(file)
+
+
+def win_rates(table):
+    """Percentage of its games against j that player i won (None on the diagonal)."""
+    return [
+        [
+            100 * wins / games if games else None
+            for wins, games in zip(row_wins, row_games)
+        ]
+        for row_wins, row_games in zip(table["wins"], table["games"])
+    ]
+
+
+def render(table, output):
+    """Draw the win-rate heatmap of ``table`` into the image file ``output``."""
+    import matplotlib
+
+    matplotlib.use("Agg")  # Headless: no display, no GUI event loop
+    import matplotlib.pyplot as plt
+
+    players = table["players"]
+    rates = win_rates(table)
+    fig, ax = plt.subplots()
+    cax = ax.matshow(
+        [[rate if rate is not None else 0.0 for rate in row] for row in rates],
+        cmap="Blues", vmin=0, vmax=100,
+    )
+    fig.colorbar(cax)
+
+    ax.set_xticks(range(len(players)))
+    ax.set_yticks(range(len(players)))
+    ax.set_xticklabels(players, rotation=45, ha="left", rotation_mode="anchor")
+    ax.set_yticklabels(players)
+    ax.set_xlabel("Opponent Algorithm")
+    ax.set_ylabel("Player Algorithm")
+    ax.set_title(f"Tournament Results (% of games won, {table['board']})")
+
+    for i, row in enumerate(rates):
+        for j, rate in enumerate(row):
+            if rate is not None:  # Skip the diagonal
+                ax.text(j, i, f"{rate:.1f}%", ha="center", va="center", color="black")
+
+    fig.tight_layout()
+    fig.savefig(output)
+    plt.close(fig)
+
+
+def render_file(path, output):
+    render(read_table(path), output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a tournament results table")
+    parser.add_argument("table", help="results table written by tournament.py (.json)")
+    parser.add_argument(
+        "--output", metavar="FILE",
+        help="image to write; .png, .svg or .pdf (default: the table's name with .png)",
+    )
+    args = parser.parse_args(argv)
+    output = args.output or os.path.splitext(args.table)[0] + ".png"
+    render_file(args.table, output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
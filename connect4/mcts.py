@@ -0,0 +1,524 @@
+"""Monte Carlo search over bitboard positions: flat PMCGS and tree-based UCT.
+
+In the UCT tree, nodes are not Python objects: every node is an index into the parallel arrays
+of a NodeStore, and the children of a node occupy a contiguous index range.
+Node values are stored from the point of view of the player who made the move
+leading to the node, so a parent always picks the child with the highest value.
+
+Nodes can also be proven (MCTS-Solver): a node whose game is over, or that the
+endgame solver has evaluated, holds its exact value for the same player, and
+proofs are backed up the tree so that selection stops wasting iterations on
+decided lines.
+
+Optionally (RAVE), every node also keeps all-moves-as-first statistics: after
+an iteration, each child of a node on the path is credited with the result
+if the player to move at that node filled the child's cell at any later
+point of the iteration, in the tree or in the rollout.  A cell is filled at
+most once per game, so "the same move" is exact even though columns repeat.
+Selection blends these quickly gathered but biased values into the child's
+own with a weight that fades as the child is visited.
+"""
+
+import itertools
+import math
+import random
+import time
+from array import array
+
+from connect4.bitboard import WIN_VALUES
+from connect4.solver import SOLVE_BELOW
+from connect4.stats import SAMPLE_EVERY, SearchStats
+
+EXPLORATION = math.sqrt(2)
+RAVE_EQUIVALENCE = 300  # Suggested k for RAVE; off unless asked for (see UCTSearch)
+UNPROVEN = 2  # Proof mark of a node whose exact value is not known (else -1, 0 or 1)
+
+
+def deadline_after(time_limit_ms):
+    """Monotonic-clock deadline ``time_limit_ms`` from now, or None for no limit."""
+    if time_limit_ms is None:
+        return None
+    return time.monotonic() + time_limit_ms / 1000
+
+
+def iterate_budget(simulations, deadline):
+    """Iteration numbers until ``simulations`` (None: unbounded) or ``deadline``.
+
+    The clock is read between iterations, so at least one always runs.
+    """
+    for sim in range(simulations) if simulations is not None else itertools.count():
+        yield sim
+        if deadline is not None and time.monotonic() >= deadline:
+            return
+
+
+def fill_mirrored(position, *columns):
+    """Copy per-column statistics to the mirror columns left out at a symmetric position."""
+    if position.is_symmetric():
+        geometry = position.geometry
+        for values in columns:
+            for col in range(geometry.width // 2 + 1, geometry.width):
+                values[col] = values[geometry.mirror_column(col)]
+
+
+def pmcgs_statistics(position, simulations, rollout, rng, deadline=None, stats=None,
+                     callback=None, every=SAMPLE_EVERY):
+    """Roll out every open column ``simulations`` times or until ``deadline``.
+
+    Returns (wi, ni): per-column sums of rollout results (YELLOW's view) and
+    rollout counts; full columns keep ni == 0.  At a symmetric position only
+    the left half of the board is rolled out and mirrored.  The rollouts draw
+    from ``rng``; they and their time are counted in ``stats`` if given, and
+    ``callback(stats, wi, ni)`` is called every ``every`` rounds of rollouts.
+    """
+    wi = [0] * position.geometry.width  # Wins for each column
+    ni = [0] * position.geometry.width  # Number of simulations for each column
+    if stats is None:
+        stats = SearchStats()
+    scratch = position.copy()  # Every rollout plays on this and is rewound afterwards
+    ply = len(scratch.moves)
+    columns = position.distinct_moves()  # Mirror images of these are filled in at the end
+    clock = time.perf_counter
+
+    for sim in iterate_budget(simulations, deadline):
+        start = clock()
+        for col in columns:
+            scratch.play(col)
+            result = rollout(scratch, rng)
+            scratch.rewind(ply)
+            ni[col] += 1
+            wi[col] += result
+        stats.rollout_time += clock() - start
+        stats.playouts += len(columns)
+
+        if callback is not None and (sim + 1) % every == 0:
+            sample_wi, sample_ni = wi[:], ni[:]
+            fill_mirrored(position, sample_wi, sample_ni)
+            callback(stats, sample_wi, sample_ni)
+
+    fill_mirrored(position, wi, ni)
+    stats.finish()
+    return wi, ni
+
+
+class NodeStore:
+    """Parallel arrays holding the statistics and links of every tree node."""
+
+    __slots__ = (
+        "visits", "values", "parents", "moves", "first_child", "num_children", "proven",
+        "amaf_visits", "amaf_values",
+    )
+
+    def __init__(self):
+        self.visits = array("i")
+        self.values = array("d")  # Sum of rollout results for the player who moved
+        self.parents = array("i")
+        self.moves = array("b")  # Column played to reach the node
+        self.first_child = array("i")  # -1 until the node is expanded
+        self.num_children = array("b")
+        self.proven = array("b")  # Exact value for the player who moved, or UNPROVEN
+        self.amaf_visits = array("i")  # RAVE: iterations that filled the node's cell later
+        self.amaf_values = array("d")  # and the sum of their results, like values
+
+    def __len__(self):
+        return len(self.visits)
+
+    def add(self, parent, move):
+        """Append a single unexpanded node and return its index."""
+        self.visits.append(0)
+        self.values.append(0.0)
+        self.parents.append(parent)
+        self.moves.append(move)
+        self.first_child.append(-1)
+        self.num_children.append(0)
+        self.proven.append(UNPROVEN)
+        self.amaf_visits.append(0)
+        self.amaf_values.append(0.0)
+        return len(self.visits) - 1
+
+    def expand(self, node, moves):
+        """Allocate one contiguous child per move and return the first index."""
+        first = len(self.visits)
+        count = len(moves)
+        self.visits.extend([0] * count)
+        self.values.extend([0.0] * count)
+        self.parents.extend([node] * count)
+        self.moves.extend(moves)
+        self.first_child.extend([-1] * count)
+        self.num_children.extend([0] * count)
+        self.proven.extend([UNPROVEN] * count)
+        self.amaf_visits.extend([0] * count)
+        self.amaf_values.extend([0.0] * count)
+        self.first_child[node] = first
+        self.num_children[node] = count
+        return first
+
+    def children(self, node):
+        first = self.first_child[node]
+        return range(first, first + self.num_children[node])
+
+
+class UCTSearch:
+    """Selection, expansion, simulation and backpropagation over a NodeStore.
+
+    With a TranspositionTable, statistics are also accumulated per position
+    key; a newly expanded child starts from whatever its transpositions (and
+    their mirror images) have already gathered instead of from zero.  A
+    symmetric position is only expanded with the left half of its moves.
+    With a Solver, leaves with at most ``solve_below`` empty cells are solved
+    exactly instead of rolled out.  Rollouts draw from ``rng`` (by default a
+    generator seeded from system entropy); reseed it for a reproducible search.
+
+    ``rave`` turns on RAVE with that equivalence parameter k: a child visited
+    n times weighs its RAVE value by sqrt(k / (3n + k)).  ``fpu`` is the
+    first-play urgency, the score of a child not visited yet, so that good
+    visited children can be preferred to trying the rest; by default (None)
+    every child is visited once before any is scored.
+    """
+
+    def __init__(self, rollout, exploration=EXPLORATION, table=None, solver=None,
+                 solve_below=SOLVE_BELOW, rng=None, rave=None, fpu=None):
+        self.rollout = rollout
+        self.rng = rng if rng is not None else random.Random()
+        self.exploration = exploration
+        self.table = table
+        self.solver = solver
+        self.solve_below = solve_below
+        self.rave = rave or None  # 0 turns RAVE off too
+        self.fpu = fpu
+        self.store = NodeStore()
+        self.root = self.store.add(-1, -1)
+        self.position = None  # Copy of the root position, set by sync()
+        self.scratch = None  # Position the iterations play on, rewound to the root
+        self.stats = SearchStats()  # Of the last search()
+
+    def select_child(self, node):
+        """Pick the child of ``node`` with the highest UCB1 value.
+
+        A proven win is taken at once and proven losses are never picked
+        while there is an alternative.  With RAVE the value part of UCB1 is
+        blended with the child's RAVE value.
+        """
+        store = self.store
+        visits, values, proven = store.visits, store.values, store.proven
+        rave, fpu = self.rave, self.fpu
+        if rave:
+            amaf_visits, amaf_values = store.amaf_visits, store.amaf_values
+        log_parent = math.log(visits[node]) if visits[node] > 0 else 0.0
+        best, best_ucb = -1, float("-inf")
+        for child in store.children(node):
+            proof = proven[child]
+            if proof == 1:
+                return child
+            if proof == -1:
+                continue
+            n = visits[child]
+            if n == 0:
+                if fpu is None:
+                    return child  # Visit every child once before using UCB1
+                ucb = fpu
+            else:
+                value = values[child] / n
+                if rave:
+                    m = amaf_visits[child]
+                    if m:
+                        beta = math.sqrt(rave / (3 * n + rave))
+                        value += beta * (amaf_values[child] / m - value)
+                ucb = value + self.exploration * math.sqrt(log_parent / n)
+            if ucb > best_ucb:
+                best, best_ucb = child, ucb
+        if best < 0:
+            return store.first_child[node]  # Every move loses
+        return best
+
+    def expand(self, node, position):
+        """Add the children of ``node``, seeding them from the transposition table."""
+        store = self.store
+        stats = self.stats
+        first = store.expand(node, position.distinct_moves())
+        stats.nodes_expanded += 1
+        if self.table is not None:
+            for child in store.children(node):
+                entry = self.table.get(position.child_key(store.moves[child]))
+                stats.cache_lookups += 1
+                if entry is not None:
+                    store.visits[child], store.values[child] = entry
+                    stats.cache_hits += 1
+        return first
+
+    def prove(self, node, position):
+        """Mark ``node`` proven if its game is over or small enough to solve.
+
+        Returns the proof, which is UNPROVEN if neither applies.
+        """
+        result = position.result()
+        if result is not None:
+            proof = result * WIN_VALUES[position.turn ^ 1]
+        elif self.solver is not None and position.empty_cells() <= self.solve_below:
+            proof = -self.solver.value(position)
+            self.stats.solved += 1
+        else:
+            return UNPROVEN
+        self.store.proven[node] = proof
+        return proof
+
+    def propagate_proof(self, path):
+        """Back a proof at the end of ``path`` up as far as it decides the parents.
+
+        A parent is lost once any child is a proven win for the player who
+        moved into it, and otherwise proven only when all its children are.
+        """
+        store = self.store
+        proven = store.proven
+        for depth in range(len(path) - 1, 0, -1):
+            proof = proven[path[depth]]
+            if proof == UNPROVEN:
+                return
+            parent = path[depth - 1]
+            if proof == 1:
+                proven[parent] = -1
+                continue
+            proofs = [proven[child] for child in store.children(parent)]
+            if UNPROVEN in proofs:
+                return
+            proven[parent] = -max(proofs)
+
+    def iterate(self):
+        """Run one selection/expansion/simulation/backpropagation pass."""
+        store = self.store
+        stats = self.stats
+        clock = time.perf_counter
+        start = clock()
+        position = self.scratch
+        ply = len(position.moves)
+        node = self.root
+        path = [node]
+        keys = [position.key]
+
+        # Selection: descend through expanded nodes that are not yet decided
+        proven = store.proven
+        while store.first_child[node] >= 0 and proven[node] == UNPROVEN:
+            node = self.select_child(node)
+            position.play(store.moves[node])
+            path.append(node)
+            keys.append(position.key)
+
+        # Expansion: add the children of an undecided leaf and step into one
+        proof = proven[node]
+        if proof == UNPROVEN and len(path) > 1:
+            proof = self.prove(node, position)
+        if proof == UNPROVEN:
+            self.expand(node, position)
+            node = self.select_child(node)
+            position.play(store.moves[node])
+            path.append(node)
+            keys.append(position.key)
+            proof = self.prove(node, position)
+        selected = clock()
+
+        # Simulation: the leaf's statistics belong to the player who moved into it, read
+        # before the rollout plays on
+        if proof == UNPROVEN:
+            mover = position.turn ^ 1
+            reward = self.rollout(position, self.rng) * WIN_VALUES[mover]
+        else:
+            reward = proof
+            self.propagate_proof(path)
+        simulated = clock()
+
+        # Backpropagation: alternate the point of view on the way up
+        if self.rave:
+            self.update_amaf(path, ply, reward)
+        table = self.table
+        for node, key in zip(reversed(path), reversed(keys)):
+            store.visits[node] += 1
+            store.values[node] += reward
+            if table is not None:
+                table.add(key, 1, reward)
+            reward = -reward
+        position.rewind(ply)
+
+        depth = len(path) - 1
+        stats.playouts += 1
+        stats.total_depth += depth
+        if depth > stats.max_depth:
+            stats.max_depth = depth
+        stats.select_time += selected - start
+        stats.rollout_time += simulated - selected
+        stats.backprop_time += clock() - simulated
+
+    def update_amaf(self, path, ply, reward):
+        """Credit the RAVE statistics of the children of every node on ``path``.
+
+        ``reward`` is the result for the player who moved into the last node;
+        the scratch position still holds every move of the iteration after
+        ``ply``, the root's.
+        """
+        store = self.store
+        moves, amaf_visits, amaf_values = store.moves, store.amaf_visits, store.amaf_values
+        position = self.scratch
+        played = position.moves
+        # The cell (bit) each move of the iteration filled, and when: undo the moves on a
+        # copy of the heights, which then are the root's again
+        heights = position.heights[:]
+        filled = {}
+        for index in range(len(played) - 1, ply - 1, -1):
+            col = played[index]
+            heights[col] -= 1
+            filled[heights[col]] = index - ply
+        if len(path) % 2 == 1:
+            reward = -reward  # For the player who moved into the root's children
+        for depth in range(len(path) - 1):
+            for child in store.children(path[depth]):
+                # A later move by the same player into the child's cell
+                index = filled.get(heights[moves[child]])
+                if index is not None and index >= depth and (index - depth) % 2 == 0:
+                    amaf_visits[child] += 1
+                    amaf_values[child] += reward
+            heights[moves[path[depth + 1]]] += 1
+            reward = -reward
+
+    def search(self, position, simulations, deadline=None, callback=None, every=SAMPLE_EVERY):
+        """Search ``position`` and return the most visited column.
+
+        Runs ``simulations`` iterations (None: no limit) or stops at the first
+        iteration boundary past ``deadline``.  ``stats`` then describes this
+        search, and ``callback(stats, wi, ni)`` is called every ``every``
+        iterations with the root statistics so far.
+        """
+        self.sync(position)
+        self.stats = SearchStats()
+        for sim in iterate_budget(simulations, deadline):
+            if self.store.proven[self.root] != UNPROVEN:
+                break  # The root is solved; more iterations cannot change the move
+            self.iterate()
+            if callback is not None and (sim + 1) % every == 0:
+                callback(self.stats, *self.root_statistics())
+        self.stats.finish()
+        return self.best_move()
+
+    def sync(self, position):
+        """Re-root the tree at ``position``, or start afresh if it is unrelated.
+
+        A position reached by playing moves from the current root keeps the
+        subtree of those moves, found through the mirror image where a
+        symmetric position expanded only one of two mirror moves; everything
+        else in the tree is discarded.
+        """
+        current = self.position
+        if current is not None and position.moves[: len(current.moves)] == current.moves:
+            replay = current.copy()
+            node = self.root
+            flipped = False  # The tree below ``node`` holds the mirror image of the game
+            for col in position.moves[len(current.moves):]:
+                symmetric = replay.is_symmetric()
+                mirror = replay.geometry.mirror_column(col)
+                flipped = flipped and not symmetric
+                child = self.find_child(node, mirror if flipped else col)
+                if child < 0 and symmetric:
+                    child = self.find_child(node, mirror)
+                    flipped = True
+                node = child
+                replay.play(col)
+                if node < 0:
+                    break
+            if node >= 0 and replay.boards == position.boards:
+                if node != self.root:
+                    self.reroot(node, position if flipped else None)
+                self.set_position(position)
+                return
+        self.store = NodeStore()
+        self.root = self.store.add(-1, -1)
+        self.set_position(position)
+
+    def set_position(self, position):
+        """Make (copies of) ``position`` the root and scratch positions."""
+        self.position = position.copy()
+        self.scratch = position.copy()
+
+    def find_child(self, node, col):
+        """Return the child of ``node`` reached by ``col``, or -1 if not expanded."""
+        store = self.store
+        for child in store.children(node):
+            if store.moves[child] == col:
+                return child
+        return -1
+
+    def reroot(self, node, mirrored=None):
+        """Copy the subtree under ``node`` into a fresh store and make it the root.
+
+        ``mirrored`` is the position at ``node`` when the subtree holds its
+        mirror image: the copy plays the mirror moves instead, down to the
+        first symmetric positions, below which both images are the same.
+        """
+        old = self.store
+        store = NodeStore()
+        root = store.add(-1, old.moves[node])
+        store.visits[root] = old.visits[node]
+        store.values[root] = old.values[node]
+        store.proven[root] = old.proven[node]
+        store.amaf_visits[root] = old.amaf_visits[node]
+        store.amaf_values[root] = old.amaf_values[node]
+        queue = [(node, root, mirrored)]
+        for old_node, new_node, position in queue:
+            children = old.children(old_node)
+            if not children:
+                continue
+            moves = [old.moves[child] for child in children]
+            if position is not None and position.is_symmetric():
+                position = None
+            if position is not None:
+                moves = [position.geometry.mirror_column(col) for col in moves]
+            first = store.expand(new_node, moves)
+            for offset, child in enumerate(children):
+                store.visits[first + offset] = old.visits[child]
+                store.values[first + offset] = old.values[child]
+                store.proven[first + offset] = old.proven[child]
+                store.amaf_visits[first + offset] = old.amaf_visits[child]
+                store.amaf_values[first + offset] = old.amaf_values[child]
+                below = None
+                if position is not None:
+                    below = position.copy()
+                    below.play(moves[offset])
+                queue.append((child, first + offset, below))
+        self.store = store
+        self.root = root
+
+    def best_move(self):
+        """Most visited root move, preferring proven wins and avoiding proven losses."""
+        store = self.store
+        children = store.children(self.root)
+        candidates = (
+            [child for child in children if store.proven[child] == 1]
+            or [child for child in children if store.proven[child] != -1]
+            or children
+        )
+        best = max(candidates, key=store.visits.__getitem__)
+        return store.moves[best]
+
+    def root_proofs(self):
+        """Per-column exact values of the root moves for the side to move (1 win, 0 draw,
+        -1 loss), None where a move is not proven.
+        """
+        store = self.store
+        proofs = [None] * self.position.geometry.width
+        for child in store.children(self.root):
+            if store.proven[child] != UNPROVEN:
+                proofs[store.moves[child]] = store.proven[child]
+        fill_mirrored(self.position, proofs)
+        return proofs
+
+    def root_statistics(self):
+        """Per-column (wi, ni) of the root children, with wi in YELLOW's view.
+
+        At a symmetric root the mirror columns repeat the searched ones.
+        """
+        store = self.store
+        sign = WIN_VALUES[self.position.turn]
+        wi = [0.0] * self.position.geometry.width
+        ni = [0] * self.position.geometry.width
+        for child in store.children(self.root):
+            wi[store.moves[child]] = sign * store.values[child]
+            ni[store.moves[child]] = store.visits[child]
+        fill_mirrored(self.position, wi, ni)
+        return wi, ni
@@ -0,0 +1,102 @@
+"""Root-parallel search: independent searches in worker processes.
+
+Every worker searches the same root position with its own share of the
+simulation budget (or until a common deadline) and its own RNG seed; the
+per-column (wi, ni) statistics of all workers are summed afterwards.  Seeds
+are derived from one master seed, so a given seed and worker count always give
+the same answer.
+"""
+
+import random
+
+from connect4.mcts import EXPLORATION, UCTSearch, pmcgs_statistics
+from connect4.rollouts import random_rollout
+from connect4.stats import SearchStats
+from connect4.transposition import TranspositionTable
+
+_pools = {}  # Worker count -> executor, kept alive between moves
+
+
+def get_pool(workers):
+    """Return a process pool with ``workers`` processes, creating it once."""
+    pool = _pools.get(workers)
+    if pool is None:
+        from concurrent.futures import ProcessPoolExecutor  # Single-process runs never load it
+
+        pool = _pools[workers] = ProcessPoolExecutor(workers)
+    return pool
+
+
+def worker_seeds(seed, workers):
+    """Derive one RNG seed per worker from ``seed`` (None: fresh entropy)."""
+    rng = random.Random(seed)
+    return [rng.getrandbits(64) for _ in range(workers)]
+
+
+def split_budget(simulations, workers):
+    """Split ``simulations`` as evenly as possible between ``workers``."""
+    if simulations is None:
+        return [None] * workers  # Time-limited: every worker runs to the deadline
+    share, extra = divmod(simulations, workers)
+    return [share + (i < extra) for i in range(workers)]
+
+
+def pmcgs_worker(position, simulations, seed, deadline, rollout=random_rollout):
+    stats = SearchStats()
+    rng = random.Random(seed)
+    wi, ni = pmcgs_statistics(position, simulations, rollout, rng, deadline, stats)
+    return wi, ni, stats
+
+
+def uct_worker(position, simulations, seed, deadline, rollout=random_rollout,
+               exploration=EXPLORATION, rave=None, fpu=None):
+    search = UCTSearch(
+        rollout, exploration, table=TranspositionTable(), rng=random.Random(seed), rave=rave,
+        fpu=fpu,
+    )
+    search.search(position, simulations, deadline=deadline)
+    wi, ni = search.root_statistics()
+    return wi, ni, search.stats, search.root_proofs()
+
+
+def root_parallel(worker, position, simulations, workers, seed=None, deadline=None,
+                  rollout=random_rollout):
+    """Run ``worker`` in ``workers`` processes and sum their per-column (wi, ni).
+
+    Returns (wi, ni, stats, proofs): the SearchStats of all workers merged,
+    and per column the exact value for the side to move that any worker
+    proved (None if none did, and always for workers that prove nothing).
+    """
+    seeds = worker_seeds(seed, workers)
+    budgets = split_budget(simulations, workers)
+    results = get_pool(workers).map(
+        worker, [position] * workers, budgets, seeds, [deadline] * workers,
+        [rollout] * workers,
+    )
+    wi = [0] * position.geometry.width
+    ni = [0] * position.geometry.width
+    proofs = [None] * position.geometry.width
+    stats = SearchStats()
+    for worker_wi, worker_ni, worker_stats, *worker_proofs in results:
+        for col in range(position.geometry.width):
+            wi[col] += worker_wi[col]
+            ni[col] += worker_ni[col]
+            if worker_proofs and worker_proofs[0][col] is not None:
+                proofs[col] = worker_proofs[0][col]
+        stats.merge(worker_stats)
+    return wi, ni, stats, proofs
+
+
+def merged_move(ni, proofs):
+    """Most visited column, preferring proven wins and avoiding proven losses.
+
+    A worker stops once it proves its root, so a winning move found late
+    can have fewer visits than the columns searched before the proof.
+    """
+    columns = range(len(ni))
+    candidates = (
+        [col for col in columns if proofs[col] == 1]
+        or [col for col in columns if proofs[col] != -1]
+        or columns
+    )
+    return max(candidates, key=ni.__getitem__)
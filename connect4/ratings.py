@@ -0,0 +1,175 @@
+"""Match statistics: sequential tests for early stopping and Elo ratings.
+
+A pairing of two engines is summarised by the wins, draws and losses of the
+first one.  Two stopping rules decide when it has played enough games:
+
+* SPRT: a sequential probability ratio test of "the Elo difference is 0"
+  against "it is at least ``elo1``", run in both directions with the normal
+  approximation of the game score (as in engine testing frameworks).  The
+  pairing is decided once one engine is shown stronger, or both tests accept
+  that neither is.
+* CI: stop once the confidence interval of the score excludes an even match.
+
+Ratings over all engines are fitted like BayesElo: a Bradley-Terry model with
+draws counted as half a win, a prior of virtual draws between the engines
+that met, and error bars from the curvature of the likelihood.
+"""
+
+import math
+
+ALPHA = 0.05  # SPRT false positive rate
+BETA = 0.05  # SPRT false negative rate
+ELO1 = 100  # Elo difference the SPRT must detect
+CONFIDENCE_Z = 1.96  # 95% intervals
+PRIOR_DRAWS = 2  # Virtual draws per pairing, so that all-win records stay finite
+FIT_ITERATIONS = 1000
+FIT_TOLERANCE = 1e-9
+ELO_PER_NAT = 400 / math.log(10)
+
+
+def expected_score(elo):
+    """Expected score of an engine ``elo`` points stronger than its opponent."""
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def elo_difference(score):
+    """Elo difference matching an expected ``score``, infinite at 0 and 1."""
+    if score <= 0:
+        return -math.inf
+    if score >= 1:
+        return math.inf
+    return -400 * math.log10(1 / score - 1)
+
+
+def score_stats(wins, draws, losses):
+    """Mean score per game and its per-game variance."""
+    games = wins + draws + losses
+    if not games:
+        return 0.5, 0.0
+    score = (wins + draws / 2) / games
+    variance = (
+        wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2
+    ) / games
+    return score, variance
+
+
+def score_interval(wins, draws, losses, z=CONFIDENCE_Z):
+    """(score, low, high): the mean score and its confidence interval."""
+    score, variance = score_stats(wins, draws, losses)
+    games = wins + draws + losses
+    margin = z * math.sqrt(variance / games) if games else 0.5
+    return score, max(score - margin, 0.0), min(score + margin, 1.0)
+
+
+def elo_interval(wins, draws, losses, z=CONFIDENCE_Z):
+    """(Elo difference, low, high) of the first engine, from score_interval()."""
+    return tuple(elo_difference(score) for score in score_interval(wins, draws, losses, z))
+
+
+def sprt_llr(wins, draws, losses, elo0, elo1):
+    """Log-likelihood ratio of "difference is elo1" over "difference is elo0"."""
+    games = wins + draws + losses
+    score, _ = score_stats(wins, draws, losses)
+    # The variance is estimated with one virtual win and loss added, so that a short
+    # run of identical results does not look infinitely certain
+    _, variance = score_stats(wins + 1, draws, losses + 1)
+    score0, score1 = expected_score(elo0), expected_score(elo1)
+    return games * (score1 - score0) * (2 * score - score0 - score1) / (2 * variance)
+
+
+def sprt_bounds(alpha=ALPHA, beta=BETA):
+    """(lower, upper): accept H0 below lower, H1 above upper."""
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+def sprt_decision(wins, draws, losses, elo1=ELO1, alpha=ALPHA, beta=BETA):
+    """Run the two-sided SPRT on the first engine's record.
+
+    Returns 1 if the first engine is stronger, -1 if the second is, 0 if the
+    difference is below ``elo1`` either way, or None to keep playing.
+    """
+    lower, upper = sprt_bounds(alpha, beta)
+    better = sprt_llr(wins, draws, losses, 0, elo1)
+    worse = sprt_llr(losses, draws, wins, 0, elo1)
+    if better >= upper:
+        return 1
+    if worse >= upper:
+        return -1
+    if better <= lower and worse <= lower:
+        return 0
+    return None
+
+
+def ci_decision(wins, draws, losses, z=CONFIDENCE_Z):
+    """1 or -1 once the score interval lies above or below 0.5, else None."""
+    _, low, high = score_interval(wins, draws, losses, z)
+    if low > 0.5:
+        return 1
+    if high < 0.5:
+        return -1
+    return None
+
+
+STOPPING_RULES = {"sprt": sprt_decision, "ci": ci_decision}
+
+
+def fit_ratings(results, prior_draws=PRIOR_DRAWS, z=CONFIDENCE_Z):
+    """Fit Elo ratings to ``results`` ({(a, b): (a's wins, draws, a's losses)}).
+
+    Returns {engine: (rating, error)}: ratings average 0 and ``error`` is the
+    half-width of a ``z`` confidence interval.  The fit is the
+    minorization-maximization iteration for the Bradley-Terry model.
+    """
+    engines = sorted({engine for pairing in results for engine in pairing})
+    if not engines:
+        return {}
+    # Points scored and games played by every engine against every opponent
+    points = {engine: 0.0 for engine in engines}
+    games = {engine: {} for engine in engines}
+    for (a, b), (wins, draws, losses) in results.items():
+        played = wins + draws + losses + prior_draws
+        if a == b or not played:
+            continue
+        points[a] += wins + (draws + prior_draws) / 2
+        points[b] += losses + (draws + prior_draws) / 2
+        games[a][b] = games[a].get(b, 0) + played
+        games[b][a] = games[b].get(a, 0) + played
+
+    strength = {engine: 1.0 for engine in engines}
+    for _ in range(FIT_ITERATIONS):
+        change = 0.0
+        for engine in engines:
+            denominator = sum(
+                played / (strength[engine] + strength[opponent])
+                for opponent, played in games[engine].items()
+            )
+            if denominator:
+                updated = max(points[engine] / denominator, 1e-12)
+                change = max(change, abs(math.log(updated / strength[engine])))
+                strength[engine] = updated
+        scale = math.exp(sum(math.log(value) for value in strength.values()) / len(engines))
+        for engine in engines:
+            strength[engine] /= scale
+        if change < FIT_TOLERANCE:
+            break
+
+    ratings = {}
+    for engine in engines:
+        information = sum(
+            played * strength[engine] * strength[opponent]
+            / (strength[engine] + strength[opponent]) ** 2
+            for opponent, played in games[engine].items()
+        )
+        error = z * ELO_PER_NAT / math.sqrt(information) if information else math.inf
+        ratings[engine] = (ELO_PER_NAT * math.log(strength[engine]), error)
+    return ratings
+
+
+def format_ratings(ratings):
+    """Rating table lines, strongest engine first."""
+    width = max((len(engine) for engine in ratings), default=0)
+    ordered = sorted(ratings.items(), key=lambda item: -item[1][0])
+    return [
+        f"{rank}. {engine:{width}} {rating:+7.1f} +/- {error:.1f}"
+        for rank, (engine, (rating, error)) in enumerate(ordered, 1)
+    ]
@@ -0,0 +1,351 @@
+"""Game records: a compressed, append-only log of played games, and streaming replay.
+
+    python -m connect4.records LOG stats
+    python -m connect4.records LOG reanalyse --engine uct:sims=20000 [--every 2]
+    python -m connect4.records LOG positions [--min-ply 8]
+
+Every game is one JSON line: the game id and whatever the tournament logs with
+it (players, seed, result), the engine specs that played it, its moves as a
+string of one character per move ("4453..." on boards up to nine columns
+wide, see MOVE_CHARS), and the milliseconds and playouts each move took.
+Boards other than 7x6 add ``width``/``height``/``connect`` fields, and a game
+that started from a board without move history adds it as ``start`` (rows
+joined by "/") and ``start_player``.  A 7x6 game takes about 100 bytes after
+compression, so millions of games fit in a few hundred megabytes.
+
+The log is gzip: every run that appends to it adds one gzip member, which
+is sync-flushed after each game, so a crash loses at most the game being
+written and the next run appends after it (``zcat`` only reads logs no run
+was killed writing; read_lines() reads past them).  read_records()
+decompresses the log chunk by chunk and yields one record at a time, and the
+pipelines built on it (statistics, reanalysis, training positions) are
+generators too, so no step holds more than one game in memory: a million
+games scan in about a minute.
+"""
+
+import argparse
+import json
+import sys
+import time
+import zlib
+
+from connect4.bitboard import STANDARD, WIN_VALUES, Position, get_geometry
+from connect4.engines import make_engine
+
+# Column c is written MOVE_CHARS[c]: 1-based digits, like the usual notation, then letters
+MOVE_CHARS = "123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ-_=+"
+MOVE_COLUMNS = {char: col for col, char in enumerate(MOVE_CHARS)}
+GZIP_WBITS = 31  # zlib's window bits for the gzip container
+GZIP_MAGIC = b"\x1f\x8b\x08"  # Start of every gzip member (deflate)
+READ_CHUNK = 1 << 16
+# The fields of a record that, with its moves, give the position after any ply
+BOARD_FIELDS = ("width", "height", "connect", "start", "start_player")
+
+
+def encode_moves(moves):
+    """The move string of a list of 0-based columns."""
+    return "".join(MOVE_CHARS[col] for col in moves)
+
+
+def decode_moves(text):
+    """The 0-based columns of a move string; ValueError for an unknown character."""
+    try:
+        return [MOVE_COLUMNS[char] for char in text]
+    except KeyError as error:
+        raise ValueError(f"Not a move: {error.args[0]}") from None
+
+
+class GameRecorder:
+    """Collects the moves of one game, with the time and playouts each took.
+
+    ``specs`` are the engine specs of the two sides, the one that moves
+    first first.
+    """
+
+    def __init__(self, position, specs):
+        geometry = position.geometry
+        self.fields = {"specs": list(specs)}
+        if (geometry.width, geometry.height) != (STANDARD.width, STANDARD.height):
+            self.fields.update(width=geometry.width, height=geometry.height)
+        if geometry.connect != STANDARD.connect:
+            self.fields["connect"] = geometry.connect
+        if position.empty_cells() < geometry.cells:
+            # A game from a board read from a file: its moves start from that board
+            self.fields["start"] = "/".join("".join(row) for row in position.to_rows())
+            self.fields["start_player"] = position.player
+        self.moves = []
+        self.ms = []
+        self.playouts = []
+
+    def add(self, move, seconds, stats=None):
+        """Record ``move`` (0-based), the seconds it took and its SearchStats (if any)."""
+        self.moves.append(move)
+        self.ms.append(round(seconds * 1000, 1))
+        self.playouts.append(stats.playouts if stats is not None else 0)
+
+    def record(self):
+        """The fields of the game's record, for RecordLog.write() with the game's id."""
+        return {
+            **self.fields,
+            "moves": encode_moves(self.moves),
+            "ms": self.ms,
+            "playouts": self.playouts,
+        }
+
+
+class RecordLog:
+    """Appends records to a gzip log; use as a context manager, or close() it."""
+
+    def __init__(self, path):
+        self.file = open(path, "ab")
+        self.compressor = zlib.compressobj(wbits=GZIP_WBITS)
+
+    def write(self, record):
+        data = self.compressor.compress(json.dumps(record, separators=(",", ":")).encode())
+        self.file.write(data + self.compressor.compress(b"\n"))
+        self.file.write(self.compressor.flush(zlib.Z_SYNC_FLUSH))
+        self.file.flush()
+
+    def close(self):
+        self.file.write(self.compressor.flush())
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_lines(path):
+    """Yield the lines of a gzip log one at a time, however many members it has.
+
+    A member a crash left unfinished ends where its data does, and reading
+    goes on at the next member; a line the crash cut short is dropped.
+    """
+    with open(path, "rb") as file:
+        start = 0
+        while start is not None:
+            start = yield from _member_lines(file, start)
+
+
+def _member_lines(file, start):
+    """Yield the lines of the members from offset ``start`` on.
+
+    Returns None at the end of the file, or where to go on reading after a
+    damaged member.
+    """
+    file.seek(start)
+    decompressor = zlib.decompressobj(GZIP_WBITS)
+    pending = b""
+    end = start  # File offset just past the data read so far
+    while True:
+        chunk = file.read(READ_CHUNK)
+        if not chunk:
+            return None
+        end += len(chunk)
+        while chunk:
+            backup = decompressor.copy()
+            try:
+                data = decompressor.decompress(chunk)
+            except zlib.error:
+                # Past the data of an unfinished member, which runs into the next
+                # member's header: keep the lines before it and go on from that header
+                *lines, _ = (pending + _salvage(backup, chunk)).split(b"\n")
+                yield from lines
+                return _find_member(file, start + 1)
+            *lines, pending = (pending + data).split(b"\n")
+            yield from lines
+            if not decompressor.eof:
+                break
+            # The next member starts right after this one's trailer
+            chunk = decompressor.unused_data
+            start = end - len(chunk)
+            decompressor = zlib.decompressobj(GZIP_WBITS)
+            pending = b""
+
+
+def _salvage(decompressor, data):
+    """What ``decompressor`` makes of ``data`` up to where it stops being deflate data."""
+    output = []
+    for index in range(len(data)):
+        try:
+            output.append(decompressor.decompress(data[index:index + 1]))
+        except zlib.error:
+            break
+    return b"".join(output)
+
+
+def _find_member(file, offset):
+    """The offset of the first gzip header at or after ``offset``, or None."""
+    file.seek(offset)
+    data = b""
+    while True:
+        chunk = file.read(READ_CHUNK)
+        if not chunk:
+            return None
+        data = data[-len(GZIP_MAGIC) + 1:] + chunk
+        offset += len(chunk)
+        found = data.find(GZIP_MAGIC)
+        if found >= 0:
+            return offset - len(data) + found
+
+
+def read_records(path):
+    """Yield the records of a gzip log, skipping lines that are not valid JSON."""
+    for line in read_lines(path):
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            continue
+
+
+def start_position(record):
+    """The position a record's game started from."""
+    connect = record.get("connect", STANDARD.connect)
+    if "start" in record:
+        rows = [list(row) for row in record["start"].split("/")]
+        return Position.from_rows(rows, record["start_player"], connect)
+    return Position(geometry=get_geometry(
+        record.get("width", STANDARD.width), record.get("height", STANDARD.height), connect
+    ))
+
+
+def replay(record):
+    """Yield (position, ply, move, ms, playouts) for every move of a record's game.
+
+    ``position`` is the position the move was played in.  It is one object,
+    advanced after each yield: copy() it to keep it.
+    """
+    position = start_position(record)
+    moves = decode_moves(record["moves"])
+    ms = record.get("ms") or [None] * len(moves)
+    playouts = record.get("playouts") or [None] * len(moves)
+    for ply, (move, took, count) in enumerate(zip(moves, ms, playouts)):
+        if not position.can_play(move):
+            raise ValueError(f"{record.get('game_id')}: illegal move {MOVE_CHARS[move]}")
+        yield position, ply, move, took, count
+        position.play(move)
+
+
+# Pipelines: each takes an iterable of records (such as read_records()) and streams
+
+
+def game_statistics(records):
+    """Totals over all games: results per pairing of specs, and per spec the
+    moves, time and playouts of its searches.
+    """
+    games = 0
+    plies = 0
+    pairings = {}
+    engines = {}
+    for record in records:
+        games += 1
+        specs = record.get("specs", ["?", "?"])
+        plies += len(record["moves"])
+        counts = pairings.setdefault(" vs ".join(specs), {"-1": 0, "0": 0, "1": 0})
+        counts[str(record["result"])] += 1
+        for ply, (took, playouts) in enumerate(zip(record["ms"], record["playouts"])):
+            totals = engines.setdefault(specs[ply % 2], {"moves": 0, "ms": 0.0, "playouts": 0})
+            totals["moves"] += 1
+            totals["ms"] += took
+            totals["playouts"] += playouts
+    for totals in engines.values():
+        seconds = totals["ms"] / 1000
+        totals["ms_per_move"] = round(totals["ms"] / totals["moves"], 3)
+        totals["playouts_per_s"] = round(totals["playouts"] / seconds, 1) if seconds else None
+        totals["ms"] = round(totals["ms"], 1)
+    return {
+        "games": games,
+        "mean_plies": round(plies / games, 2) if games else None,
+        "results": pairings,  # Keyed by result: -1 RED wins, 0 draw, 1 YELLOW wins
+        "engines": engines,
+    }
+
+
+def reanalyse(records, spec, every=1, seed=None):
+    """Search the positions of every game again with the engine ``spec``.
+
+    Yields one dict per analysed move (every ``every``-th ply): the move
+    played, the engine's move and values (YELLOW's view) and whether they
+    agree.  The engine keeps its tree within a game and is reset between
+    games.
+    """
+    engine = make_engine(spec, seed=seed)
+    for record in records:
+        engine.reset()
+        for position, ply, move, _, _ in replay(record):
+            if ply % every:
+                continue
+            result = engine.search(position)
+            yield {
+                "game_id": record.get("game_id"),
+                "ply": ply,
+                "played": move + 1,
+                "best": result.move + 1,
+                "agrees": result.move == move,
+                "values": result.values,
+            }
+
+
+def training_positions(records, min_ply=0, every=1):
+    """Yield every ``every``-th position from ply ``min_ply`` on, labelled with
+    the game's outcome: its moves (after the game's board fields and start, if
+    any), the side to move, the move played and the result from the point of
+    view of the side to move (1 win, 0 draw, -1 loss).
+    """
+    for record in records:
+        board = {key: record[key] for key in BOARD_FIELDS if key in record}
+        for position, ply, move, _, _ in replay(record):
+            if ply < min_ply or (ply - min_ply) % every:
+                continue
+            yield {
+                **board,
+                "moves": record["moves"][:ply],
+                "player": position.player,
+                "played": move + 1,
+                "value": record["result"] * WIN_VALUES[position.turn],
+            }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay and analyse a game record log")
+    parser.add_argument("log", help="game log written by a tournament (.games.gz)")
+    parser.add_argument(
+        "command", choices=["stats", "reanalyse", "positions"],
+        help="stats: totals per pairing and engine; reanalyse: search the games' positions "
+        "again with --engine; positions: outcome-labelled training positions",
+    )
+    parser.add_argument(
+        "--engine", default="uct:sims=10000", metavar="SPEC",
+        help="reanalyse: engine spec (default uct:sims=10000)",
+    )
+    parser.add_argument("--every", type=int, default=1, metavar="N", help="every N-th ply")
+    parser.add_argument(
+        "--min-ply", type=int, default=0, metavar="N", help="positions: skip the first N plies"
+    )
+    parser.add_argument("--limit", type=int, metavar="N", help="only the first N games")
+    parser.add_argument("--seed", type=int, help="reanalyse: seed of the engine")
+    args = parser.parse_args(argv)
+
+    records = read_records(args.log)
+    if args.limit is not None:
+        records = (record for _, record in zip(range(args.limit), records))
+    start = time.perf_counter()
+    if args.command == "stats":
+        results = game_statistics(records)
+        results["seconds"] = round(time.perf_counter() - start, 3)
+        json.dump(results, sys.stdout, indent=2)
+        print()
+        return 0
+    if args.command == "reanalyse":
+        lines = reanalyse(records, args.engine, args.every, args.seed)
+    else:
+        lines = training_positions(records, args.min_ply, args.every)
+    for line in lines:
+        print(json.dumps(line))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""Rollout policies: play a position out to the end of the game.
+
+A rollout plays its moves on the position it is given and returns the game
+value from YELLOW's (Max) point of view: 1 for a YELLOW win, -1 for RED, 0 for
+a draw.  The position is left at the end of the game; searches rewind() one
+scratch position after every rollout rather than copying the board.
+
+Every rollout draws its moves from the ``rng`` it is given (a random.Random),
+so a seeded search replays exactly.  A move is picked by indexing with
+``rng.random()``, which costs half as much as ``rng.choice()``.
+"""
+
+from connect4.bitboard import WIN_VALUES
+
+
+# Simulate a random rollout (helper function for PMC/UCT)
+def random_rollout(position, rng):
+    # Bound once: play() updates the open-column list in place
+    moves = position.legal_moves()
+    play = position.play
+    uniform = rng.random
+    while not position.last_move_won():
+        if not moves:
+            return 0  # Draw
+        play(moves[int(uniform() * len(moves))])
+    return WIN_VALUES[position.turn ^ 1]
+
+
+# Heavy playout: win if possible, else block, else a centre-weighted random move
+# (columns weighted by how many horizontal lines pass through them, 1-2-3-4-3-2-1 on 7x6)
+def heavy_rollout(position, rng):
+    moves = position.legal_moves()
+    play = position.play
+    can_play = position.can_play
+    uniform = rng.random
+    centre_bag = position.geometry.centre_bag
+    stride = position.geometry.stride
+    bag = len(centre_bag)
+    while not position.last_move_won():
+        if not moves:
+            return 0  # Draw
+        playable = position.legal_mask()
+        # Cells that complete a line for the side to move, then for the opponent
+        target = position.threats(position.turn) & playable
+        if not target:
+            target = position.threats(position.turn ^ 1) & playable
+        if target:
+            play(((target & -target).bit_length() - 1) // stride)
+        else:
+            col = centre_bag[int(uniform() * bag)]
+            while not can_play(col):  # Rejection sampling keeps the weights of open columns
+                col = centre_bag[int(uniform() * bag)]
+            play(col)
+    return WIN_VALUES[position.turn ^ 1]
+
+
+ROLLOUTS = {"random": random_rollout, "heavy": heavy_rollout}
@@ -0,0 +1,87 @@
+"""Tournament scheduling with a resumable, append-only results file.
+
+Every game has a unique id.  Finished games are appended to a JSONL file one
+line at a time as soon as they complete, so an interrupted run loses at most
+the games that were in progress; running again skips every id already in the
+file.  Alongside the results, the full record of every game (its moves, engine
+specs and per-move timings) can go to a compressed log of connect4.records.
+"""
+
+import contextlib
+import json
+import os
+
+from connect4.records import RecordLog
+
+
+def read_results(path):
+    """Return the game records stored in ``path`` (none if it does not exist).
+
+    A line cut short by a crash is ignored; that game is simply played again.
+    """
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, "r") as file:
+        for line in file:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+
+def _open_for_append(path):
+    """Open ``path`` for appending, terminating a partially written last line."""
+    needs_newline = False
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        with open(path, "rb") as file:
+            file.seek(-1, os.SEEK_END)
+            needs_newline = file.read(1) != b"\n"
+    file = open(path, "a")
+    if needs_newline:
+        file.write("\n")
+    return file
+
+
+def run_games(games, play_game, results_path, workers=1, records_path=None):
+    """Play every game not yet recorded in ``results_path`` and append its record.
+
+    ``games`` is a list of (game_id, info, args) tuples: ``play_game(*args)``
+    returns the game result and the fields of its game record, and the result
+    is stored as ``{"game_id", **info, "result"}``.  With ``records_path`` the
+    game record, with the same fields first, is appended to that log too.
+    With ``workers`` > 1 the games run in a process pool and are written in the
+    order they finish.  Returns all records in the results file, old and new.
+    """
+    completed = {record["game_id"] for record in read_results(results_path)}
+    pending = [game for game in games if game[0] not in completed]
+
+    with contextlib.ExitStack() as stack:
+        file = stack.enter_context(_open_for_append(results_path))
+        log = stack.enter_context(RecordLog(records_path)) if records_path and pending else None
+
+        def store(game_id, info, played):
+            result, game = played
+            record = {"game_id": game_id, **info, "result": result}
+            if log is not None:
+                # Before the results file: a game in it is never played again
+                log.write({**record, **game})
+            file.write(json.dumps(record) + "\n")
+            file.flush()
+
+        if workers > 1 and pending:
+            from concurrent.futures import ProcessPoolExecutor, as_completed
+
+            with ProcessPoolExecutor(workers) as pool:
+                futures = {
+                    pool.submit(play_game, *args): (game_id, info)
+                    for game_id, info, args in pending
+                }
+                for future in as_completed(futures):
+                    store(*futures[future], future.result())
+        else:
+            for game_id, info, args in pending:
+                store(game_id, info, play_game(*args))
+
+    return read_results(results_path)
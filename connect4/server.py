@@ -0,0 +1,209 @@
+"""Move server: a long-running engine process answering move requests over a socket.
+
+Starting ``main.py`` (or main.exe) costs far more than a short search, so a
+harness that asks for one move at a time is better served by a process that
+stays up.  The server speaks JSON lines over a Unix socket or localhost TCP:
+every request is one JSON object on one line, every answer too.  A request
+names the position either by its ``moves`` (1-based columns from the empty
+board, which lets the engine reuse its tree between moves of a game) or by
+``board`` and ``player`` as in the input files, plus the ``algorithm`` (an
+engine spec, see connect4.engines) and an optional ``game``, ``simulations``
+or ``movetime``.  An ``id`` is echoed back, so a client can send several
+requests before reading the answers.  Boards other than 7x6 connect-four take
+``width`` and ``height`` (with ``moves``) and ``connect`` fields.
+
+Requests are searched in worker processes, each with a single thread, so that
+all requests of a game go to the same worker and find its tree and tables
+still warm from the previous move.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import signal
+import socket
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from connect4.bitboard import PLAYERS, STANDARD, Position, get_geometry
+
+
+def parse_address(address):
+    """("tcp", host, port) for "host:port" or ":port", else ("unix", path)."""
+    host, separator, port = address.rpartition(":")
+    if separator and port.isdigit():
+        return "tcp", host or "127.0.0.1", int(port)
+    return "unix", address
+
+
+def request_position(request):
+    """Build the Position a request asks about; ValueError if it is malformed."""
+    connect = int(request.get("connect", STANDARD.connect))
+    if "moves" in request:
+        position = Position(geometry=get_geometry(
+            int(request.get("width", STANDARD.width)),
+            int(request.get("height", STANDARD.height)),
+            connect,
+        ))
+        for move in request["moves"]:
+            col = int(move) - 1
+            if not 0 <= col < position.geometry.width or not position.can_play(col):
+                raise ValueError(f"Illegal move: {move}")
+            position.play(col)
+        return position
+    board = request.get("board")
+    if isinstance(board, str):
+        board = board.split("/")
+    if not board or any(len(row) != len(board[0]) for row in board):
+        raise ValueError("Expected moves, or a board of rows of one length")
+    player = request.get("player")
+    if player not in PLAYERS:
+        raise ValueError(f"Unknown player: {player}")
+    return Position.from_rows([list(row) for row in board], player, connect)
+
+
+def position_fields(position):
+    """Request fields naming ``position``: its moves if it has its full history."""
+    geometry = position.geometry
+    if len(position.moves) + position.empty_cells() == geometry.cells:
+        fields = {"moves": [col + 1 for col in position.moves]}
+        if (geometry.width, geometry.height) != (STANDARD.width, STANDARD.height):
+            fields.update(width=geometry.width, height=geometry.height)
+    else:
+        rows = "/".join("".join(row) for row in position.to_rows())
+        fields = {"board": rows, "player": position.player}
+    if geometry.connect != STANDARD.connect:
+        fields["connect"] = geometry.connect
+    return fields
+
+
+class MoveServer:
+    """Routes requests to single-process executors and writes back their answers.
+
+    ``handler(request)`` runs in the worker processes and returns the answer
+    (a dict); a ValueError it raises is sent back as ``{"error": message}``.
+    """
+
+    def __init__(self, handler, workers=1):
+        self.handler = handler
+        self.executors = [ProcessPoolExecutor(1) for _ in range(max(workers, 1))]
+        self.next_executor = itertools.cycle(self.executors)  # For requests without a game
+
+    def route(self, request):
+        """The executor of the request's game, the same one for every move."""
+        game = request.get("game")
+        if game is None:
+            return next(self.next_executor)
+        return self.executors[zlib.crc32(str(game).encode()) % len(self.executors)]
+
+    async def answer(self, line):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("A request must be a JSON object")
+        except ValueError as error:
+            return {"error": f"Invalid request: {error}"}
+        loop = asyncio.get_running_loop()
+        try:
+            answer = await loop.run_in_executor(self.route(request), self.handler, request)
+        except ValueError as error:
+            answer = {"error": str(error)}
+        except Exception as error:  # A bug must not leave the client waiting
+            answer = {"error": f"Internal error: {type(error).__name__}: {error}"}
+        if "id" in request:
+            answer = {"id": request["id"], **answer}
+        return answer
+
+    async def handle_connection(self, reader, writer):
+        """Answer every line of a connection, concurrently and in completion order."""
+
+        async def respond(line):
+            answer = await self.answer(line)
+            writer.write((json.dumps(answer) + "\n").encode())
+            await writer.drain()
+
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    task = asyncio.create_task(respond(line))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(tasks)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, address):
+        kind, *where = parse_address(address)
+        if kind == "tcp":
+            server = await asyncio.start_server(self.handle_connection, *where)
+        else:
+            server = await asyncio.start_unix_server(self.handle_connection, *where)
+        print(f"Serving moves on {address}", flush=True)
+        try:
+            # Stop cleanly (removing the socket file) on SIGTERM as well as Ctrl+C
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGTERM, asyncio.current_task().cancel
+            )
+        except NotImplementedError:
+            pass  # No signal handlers in the Windows event loop
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if kind == "unix" and os.path.exists(where[0]):
+                os.remove(where[0])
+
+    def close(self):
+        for executor in self.executors:
+            executor.shutdown(cancel_futures=True)
+
+
+def serve(address, handler, workers=1):
+    """Run a MoveServer on ``address`` until interrupted."""
+    server = MoveServer(handler, workers)
+    try:
+        asyncio.run(server.serve(address))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    finally:
+        server.close()
+
+
+class MoveClient:
+    """Blocking client keeping one connection to a move server."""
+
+    def __init__(self, address):
+        kind, *where = parse_address(address)
+        if kind == "tcp":
+            self.socket = socket.create_connection(tuple(where))
+        else:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.connect(where[0])
+        self.file = self.socket.makefile("rwb")
+
+    def request(self, **request):
+        """Send one request and return the answer; RuntimeError if it is an error."""
+        self.file.write((json.dumps(request) + "\n").encode())
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("The move server closed the connection")
+        answer = json.loads(line)
+        if "error" in answer:
+            raise RuntimeError(answer["error"])
+        return answer
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,152 @@
+"""Exact endgame solver: negamax with alpha-beta pruning.
+
+Positions are scored from the side to move as 1 (win), 0 (draw) or -1 (loss)
+with perfect play.  Immediate wins and forced blocks are read off the threat
+masks, moves that hand the opponent a win are tried last, the rest are ordered
+centre first, and results are cached in a fixed-size transposition table of
+bounds, shared by a position and its mirror image.  At a symmetric position
+only one of every pair of mirrored moves is searched.  Searching the whole
+game tree is only practical once the board is nearly full; the Monte Carlo
+searches call the solver below a configurable number of empty cells.
+"""
+
+from array import array
+
+from connect4.bitboard import WIN_VALUES
+
+SOLVE_BELOW = 14  # Default empty-cell count at which searches switch to the solver
+SOLVER_TABLE_BITS = 20
+
+# Bound kinds stored in the table next to the value
+EXACT, LOWER, UPPER = 1, 2, 3
+
+
+class SolverTable:
+    """Always-replace table of (bound kind, value) per position key."""
+
+    __slots__ = ("keys", "entries", "mask")
+
+    def __init__(self, bits=SOLVER_TABLE_BITS):
+        self.keys = array("Q", bytes(8 * (1 << bits)))
+        self.entries = array("b", bytes(1 << bits))  # kind * 4 + value + 1; 0 is empty
+        self.mask = (1 << bits) - 1
+
+    def get(self, key):
+        slot = key & self.mask
+        entry = self.entries[slot]
+        if entry and self.keys[slot] == key:
+            return entry >> 2, (entry & 3) - 1
+        return None
+
+    def put(self, key, kind, value):
+        slot = key & self.mask
+        self.keys[slot] = key
+        self.entries[slot] = kind * 4 + value + 1
+
+
+class Solver:
+    """Weak (win/draw/loss) solver with its own transposition table."""
+
+    def __init__(self, table=None):
+        self.table = table if table is not None else SolverTable()
+        self.nodes = 0  # Positions visited, over the solver's lifetime
+
+    def negamax(self, position, alpha, beta):
+        """Value of ``position`` for the side to move, within (alpha, beta)."""
+        self.nodes += 1
+        playable = position.legal_mask()
+        if position.threats(position.turn) & playable:
+            return 1
+        if not position.legal:
+            return 0
+        opponent = position.threats(position.turn ^ 1) & playable
+        if opponent & (opponent - 1):
+            return -1  # Two immediate threats cannot both be blocked
+        if opponent:
+            position.play(((opponent & -opponent).bit_length() - 1) // position.geometry.stride)
+            value = -self.negamax(position, -beta, -alpha)
+            position.undo()
+            return value
+
+        key = position.key
+        entry = self.table.get(key)
+        if entry is not None:
+            kind, value = entry
+            if kind == EXACT:
+                return value
+            if kind == LOWER:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value
+
+        original_alpha = alpha
+        best = -1
+        for col in self.ordered_moves(position):
+            position.play(col)
+            value = -self.negamax(position, -beta, -alpha)
+            position.undo()
+            if value > best:
+                best = value
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                break
+
+        if best <= original_alpha:
+            self.table.put(key, UPPER, best)
+        elif best >= beta:
+            self.table.put(key, LOWER, best)
+        else:
+            self.table.put(key, EXACT, best)
+        return best
+
+    def ordered_moves(self, position):
+        """Open columns, centre first; moves just below an opponent threat go last."""
+        danger = position.threats(position.turn ^ 1)
+        heights = position.heights
+        symmetric = position.is_symmetric()
+        safe, unsafe = [], []
+        last = position.geometry.width - 1
+        for col in position.geometry.centre_order:
+            if symmetric and col > last - col:
+                continue
+            if position.can_play(col):
+                if danger >> (heights[col] + 1) & 1:
+                    unsafe.append(col)
+                else:
+                    safe.append(col)
+        return safe + unsafe
+
+    def value(self, position):
+        """Exact value of ``position`` for the side to move: 1, 0 or -1."""
+        result = position.result()
+        if result is not None:
+            return result * WIN_VALUES[position.turn]
+        return self.negamax(position, -1, 1)
+
+    def column_values(self, position):
+        """Exact value of every open column for the side to move, or None if full."""
+        geometry = position.geometry
+        values = [None] * geometry.width
+        for col in position.distinct_moves()[:]:
+            position.play(col)
+            if position.last_move_won():
+                values[col] = 1
+            else:
+                values[col] = -self.value(position)
+            position.undo()
+        if position.is_symmetric():
+            for col in range(geometry.width):
+                values[col] = values[min(col, geometry.mirror_column(col))]
+        return values
+
+    def best_move(self, position):
+        """Return (column, value) of a best move for the side to move."""
+        values = self.column_values(position)
+        col = max(
+            (col for col in position.geometry.centre_order if values[col] is not None),
+            key=values.__getitem__,
+        )
+        return col, values[col]
@@ -0,0 +1,122 @@
+"""Search instrumentation: counters and phase timings gathered while searching.
+
+The searches update a SearchStats as they go, at the cost of a few integer
+additions and clock reads per iteration, and hand it back with the move.  A
+search can also be given a ``callback(stats, wi, ni)`` that is called every
+``every`` iterations with the statistics so far and a copy of the per-column
+(wi, ni) at the root, YELLOW's view, which is how the Verbose output is
+produced without printing from inside the search loops.
+"""
+
+import time
+
+SAMPLE_EVERY = 1000  # Default iterations between two callback samples
+
+
+class SearchStats:
+    """What one search did and where its time went.
+
+    Times are in seconds.  ``select_time`` covers selection and expansion
+    (including leaves proven by the endgame solver), ``rollout_time`` the
+    simulations and ``backprop_time`` the backpropagation; searches without a
+    tree only have rollout time.  Depths count plies below the root.
+    """
+
+    __slots__ = (
+        "playouts", "nodes_expanded", "cache_hits", "cache_lookups", "solved", "max_depth",
+        "total_depth", "select_time", "rollout_time", "backprop_time", "elapsed", "start",
+    )
+
+    def __init__(self, playouts=0):
+        self.playouts = playouts
+        self.nodes_expanded = 0
+        self.cache_hits = 0  # Expanded children seeded from the transposition table
+        self.cache_lookups = 0
+        self.solved = 0  # Leaves valued by the endgame solver instead of a rollout
+        self.max_depth = 0
+        self.total_depth = 0  # Sum over the iterations of the depth reached
+        self.select_time = 0.0
+        self.rollout_time = 0.0
+        self.backprop_time = 0.0
+        self.elapsed = 0.0
+        self.start = time.perf_counter()
+
+    def finish(self):
+        """Record the wall time since the stats were created; returns self."""
+        self.elapsed = time.perf_counter() - self.start
+        return self
+
+    @property
+    def mean_depth(self):
+        return self.total_depth / self.playouts if self.playouts else 0.0
+
+    @property
+    def playouts_per_s(self):
+        elapsed = self.elapsed or time.perf_counter() - self.start
+        return self.playouts / elapsed if elapsed > 0 else 0.0
+
+    def merge(self, other):
+        """Add the counters of ``other`` (a search run alongside this one) to these."""
+        for name in (
+            "playouts", "nodes_expanded", "cache_hits", "cache_lookups", "solved", "total_depth",
+            "select_time", "rollout_time", "backprop_time",
+        ):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.max_depth = max(self.max_depth, other.max_depth)
+        self.elapsed = max(self.elapsed, other.elapsed)
+        return self
+
+    def as_dict(self):
+        """The statistics as a JSON-ready dict (times in milliseconds)."""
+        return {
+            "playouts": self.playouts,
+            "nodes_expanded": self.nodes_expanded,
+            "cache_hits": self.cache_hits,
+            "cache_lookups": self.cache_lookups,
+            "solved": self.solved,
+            "max_depth": self.max_depth,
+            "mean_depth": round(self.mean_depth, 2),
+            "select_ms": round(self.select_time * 1000, 3),
+            "rollout_ms": round(self.rollout_time * 1000, 3),
+            "backprop_ms": round(self.backprop_time * 1000, 3),
+            "elapsed_ms": round(self.elapsed * 1000, 3),
+        }
+
+    @classmethod
+    def from_dict(cls, fields):
+        """Rebuild stats sent as as_dict(), e.g. by the move server."""
+        stats = cls(fields["playouts"])
+        for name in ("nodes_expanded", "cache_hits", "cache_lookups", "solved", "max_depth"):
+            setattr(stats, name, fields[name])
+        stats.total_depth = fields["mean_depth"] * stats.playouts
+        stats.select_time = fields["select_ms"] / 1000
+        stats.rollout_time = fields["rollout_ms"] / 1000
+        stats.backprop_time = fields["backprop_ms"] / 1000
+        stats.elapsed = fields["elapsed_ms"] / 1000
+        return stats
+
+    def summary(self):
+        """A few lines describing the search, for the Verbose output."""
+        lines = [
+            f"Playouts: {self.playouts} in {self.elapsed * 1000:.1f} ms "
+            f"({self.playouts_per_s:.0f}/s)"
+        ]
+        if self.nodes_expanded:
+            lines.append(
+                f"Nodes expanded: {self.nodes_expanded}, depth {self.mean_depth:.1f} "
+                f"(max {self.max_depth}), solved leaves: {self.solved}"
+            )
+        if self.cache_lookups:
+            lines.append(f"Transposition hits: {self.cache_hits}/{self.cache_lookups}")
+        phases = [
+            f"{name} {seconds * 1000:.1f} ms"
+            for name, seconds in (
+                ("selection", self.select_time),
+                ("rollouts", self.rollout_time),
+                ("backpropagation", self.backprop_time),
+            )
+            if seconds
+        ]
+        if phases:
+            lines.append("Time: " + ", ".join(phases))
+        return "\n".join(lines)
@@ -0,0 +1,69 @@
+"""Fixed-size transposition table for sharing search statistics.
+
+Many move orders reach the same Connect Four position.  The table keeps
+(visits, value sum) per Zobrist hash so every path into a position sees the
+statistics gathered through all of them.  Entries live in typed arrays that are
+allocated once; the table never grows.
+"""
+
+from array import array
+
+TABLE_BITS = 18  # 2**18 buckets of two entries, about 10 MB
+
+
+class TranspositionTable:
+    """Two-way bucketed hash table with visit-weighted replacement.
+
+    A position hashes to a bucket of two slots.  When neither slot holds the
+    position, the slot with fewer visits is overwritten, so well-explored
+    entries survive and rarely visited ones are evicted first.
+    """
+
+    __slots__ = ("keys", "visits", "values", "mask", "hits", "lookups")
+
+    def __init__(self, bits=TABLE_BITS):
+        size = 2 << bits
+        self.keys = array("Q", bytes(8 * size))
+        self.visits = array("i", bytes(4 * size))  # 0 marks an empty slot
+        self.values = array("d", bytes(8 * size))
+        self.mask = (1 << bits) - 1
+        self.hits = 0
+        self.lookups = 0
+
+    def find(self, key):
+        """Return the slot holding ``key``, or -1."""
+        slot = (key & self.mask) << 1
+        if self.visits[slot] and self.keys[slot] == key:
+            return slot
+        slot += 1
+        if self.visits[slot] and self.keys[slot] == key:
+            return slot
+        return -1
+
+    def get(self, key):
+        """Return (visits, value sum) stored for ``key``, or None."""
+        self.lookups += 1
+        slot = self.find(key)
+        if slot < 0:
+            return None
+        self.hits += 1
+        return self.visits[slot], self.values[slot]
+
+    def add(self, key, visits, value):
+        """Add ``visits`` and ``value`` to the entry for ``key``, inserting it if needed."""
+        slot = self.find(key)
+        if slot < 0:
+            slot = (key & self.mask) << 1
+            if self.visits[slot + 1] < self.visits[slot]:
+                slot += 1
+            self.keys[slot] = key
+            self.visits[slot] = 0
+            self.values[slot] = 0.0
+        self.visits[slot] += visits
+        self.values[slot] += value
+
+    def clear(self):
+        size = len(self.visits)
+        self.visits = array("i", bytes(4 * size))
+        self.hits = 0
+        self.lookups = 0
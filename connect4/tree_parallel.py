@@ -0,0 +1,212 @@
+"""Tree-parallel UCT: several processes growing one shared search tree.
+
+The node arrays live in a single multiprocessing.shared_memory block.  A lock
+serialises selection, expansion and backpropagation, while the rollouts (where
+almost all the time goes) run concurrently.  A worker adds a virtual loss to
+every node on the path it selected until its rollout result is backed up, so
+the other workers are steered towards different parts of the tree.
+
+Unlike root parallelism the outcome depends on process scheduling, so seeded
+runs are not reproducible, and the transposition table is not shared.
+"""
+
+import multiprocessing
+import random
+from multiprocessing import shared_memory
+
+from connect4.bitboard import WIN_VALUES
+from connect4.mcts import EXPLORATION, UNPROVEN, UCTSearch, iterate_budget
+from connect4.parallel import split_budget, worker_seeds
+from connect4.rollouts import random_rollout
+from connect4.stats import SearchStats
+
+VIRTUAL_LOSS = 1.0
+TIMED_CAPACITY = 1 << 21  # Nodes preallocated for a time-limited search (~46 MB)
+
+# Bytes per node of each array, widest first so every view stays aligned
+_FIELDS = (
+    ("values", "d", 8),
+    ("visits", "i", 4),
+    ("parents", "i", 4),
+    ("first_child", "i", 4),
+    ("moves", "b", 1),
+    ("num_children", "b", 1),
+    ("proven", "b", 1),  # Always UNPROVEN: the shared tree does not use the solver
+)
+_HEADER = 8  # Node count, as one int64
+
+
+class SharedNodeStore:
+    """NodeStore layout over a fixed-capacity shared memory block."""
+
+    __slots__ = ("shm", "capacity", "header") + tuple(name for name, _, _ in _FIELDS)
+
+    def __init__(self, shm, capacity):
+        self.shm = shm
+        self.capacity = capacity
+        self.header = shm.buf[:_HEADER].cast("q")
+        offset = _HEADER
+        for name, code, size in _FIELDS:
+            view = shm.buf[offset:offset + size * capacity].cast(code)
+            setattr(self, name, view)
+            offset += size * capacity
+
+    @classmethod
+    def create(cls, capacity):
+        size = _HEADER + capacity * sum(size for _, _, size in _FIELDS)
+        return cls(shared_memory.SharedMemory(create=True, size=size), capacity)
+
+    @classmethod
+    def attach(cls, name, capacity):
+        return cls(shared_memory.SharedMemory(name=name), capacity)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def __len__(self):
+        return self.header[0]
+
+    def add(self, parent, move):
+        node = self.header[0]
+        self.header[0] = node + 1
+        self.visits[node] = 0
+        self.values[node] = 0.0
+        self.parents[node] = parent
+        self.moves[node] = move
+        self.first_child[node] = -1
+        self.num_children[node] = 0
+        self.proven[node] = UNPROVEN
+        return node
+
+    def expand(self, node, moves):
+        first = self.header[0]
+        for move in moves:
+            self.add(node, move)
+        self.first_child[node] = first
+        self.num_children[node] = len(moves)
+        return first
+
+    def children(self, node):
+        first = self.first_child[node]
+        return range(first, first + self.num_children[node])
+
+    def close(self, unlink=False):
+        """Release the views and detach; the creator also unlinks the block."""
+        for name in ("header",) + tuple(name for name, _, _ in _FIELDS):
+            getattr(self, name).release()
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+class VirtualLossSearch(UCTSearch):
+    """UCT iterations on a SharedNodeStore, guarded by a shared lock."""
+
+    def __init__(self, rollout, store, lock, exploration=EXPLORATION, virtual_loss=VIRTUAL_LOSS,
+                 rng=None):
+        super().__init__(rollout, exploration, rng=rng)
+        self.store = store
+        self.root = 0
+        self.lock = lock
+        self.virtual_loss = virtual_loss
+
+    def iterate(self):
+        store = self.store
+        loss = self.virtual_loss
+        position = self.scratch
+        ply = len(position.moves)
+
+        with self.lock:
+            # Selection: count the visit now and charge a virtual loss per node
+            node = self.root
+            path = [node]
+            store.visits[node] += 1
+            store.values[node] -= loss
+            while store.first_child[node] >= 0:
+                node = self.select_child(node)
+                position.play(store.moves[node])
+                path.append(node)
+                store.visits[node] += 1
+                store.values[node] -= loss
+
+            # Expansion, unless the store is full: then the leaf is rolled out as is
+            result = position.result()
+            if result is None and len(store) + position.geometry.width <= store.capacity:
+                self.expand(node, position)
+                node = self.select_child(node)
+                position.play(store.moves[node])
+                path.append(node)
+                store.visits[node] += 1
+                store.values[node] -= loss
+
+        mover = position.turn ^ 1
+        if result is None:
+            result = self.rollout(position, self.rng)
+
+        with self.lock:
+            # Backpropagation: replace each virtual loss by the real result
+            reward = result * WIN_VALUES[mover]
+            for node in reversed(path):
+                store.values[node] += reward + loss
+                reward = -reward
+        position.rewind(ply)
+        return result
+
+
+def _tree_worker(name, capacity, lock, position, simulations, seed, exploration, deadline,
+                 rollout):
+    store = SharedNodeStore.attach(name, capacity)
+    search = VirtualLossSearch(rollout, store, lock, exploration, rng=random.Random(seed))
+    search.set_position(position)
+    for _ in iterate_budget(simulations, deadline):
+        search.iterate()
+    del search
+    store.close()
+
+
+def tree_parallel_search(position, simulations, workers, seed=None, exploration=EXPLORATION,
+                         deadline=None, rollout=random_rollout):
+    """Grow one shared UCT tree with ``workers`` processes.
+
+    Returns (best move, wi, ni, stats), like the root-parallel search; only
+    the playouts are counted in the stats.  A time-limited search
+    (``simulations`` None) preallocates TIMED_CAPACITY nodes; once the store
+    is full, leaves are rolled out without expansion.
+    """
+    if simulations is None:
+        capacity = TIMED_CAPACITY
+    else:
+        # Each iteration expands at most one node
+        capacity = simulations * position.geometry.width + 1
+    stats = SearchStats()
+    store = SharedNodeStore.create(capacity)
+    try:
+        store.add(-1, -1)
+        lock = multiprocessing.Lock()
+        processes = [
+            multiprocessing.Process(
+                target=_tree_worker,
+                args=(
+                    store.name, capacity, lock, position, budget, worker_seed, exploration,
+                    deadline, rollout,
+                ),
+            )
+            for budget, worker_seed in zip(
+                split_budget(simulations, workers), worker_seeds(seed, workers)
+            )
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        search = VirtualLossSearch(rollout, store, lock, exploration)
+        search.set_position(position)
+        wi, ni = search.root_statistics()
+        best_move = search.best_move()
+        stats.playouts = store.visits[search.root]  # Every iteration visits the root once
+        del search
+    finally:
+        store.close(unlink=True)
+    return best_move, wi, ni, stats.finish()
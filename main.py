@@ -1,14 +1,31 @@
-import sys
+import argparse
+import functools
+import itertools
+import os
 import random
-import math
-
-
-# Constants
-ROWS = 6
-COLUMNS = 7
-RED = "R"  # Min player
-YELLOW = "Y"  # Max player
-EMPTY = "O"
+import sys
+import time
+
+from connect4.batch import read_positions, run_batch
+from connect4.bitboard import WIN_VALUES, Position
+from connect4.book import BOOK_PATH, load_book
+from connect4.engines import (
+    Budget, SearchResult, UniformRandom, column_values, make_engine, parse_spec,
+)
+from connect4.mcts import RAVE_EQUIVALENCE
+from connect4.ratings import STOPPING_RULES, elo_interval, fit_ratings, format_ratings
+from connect4.records import GameRecorder
+from connect4.rollouts import ROLLOUTS
+from connect4.scheduler import run_games
+from connect4.seeding import SEED_BITS, derive_seed, fresh_seed
+from connect4.solver import SOLVE_BELOW, Solver
+from connect4.stats import SAMPLE_EVERY, SearchStats
+from connect4.transposition import TranspositionTable
+
+# Start-up time counts for every single-move run (and every PyInstaller launch), so the
+# modules only some modes need are imported by those modes: connect4.server (asyncio,
+# sockets) by the server and its clients, process pools when there are workers, and
+# NumPy by the vectorized search
 
 
 # Helper function to read the board from the file
@@ -18,406 +35,657 @@ def read_board_from_file(filename):
 
     algorithm = lines[0].strip()
     player = lines[1].strip()
-    board = [list(line.strip()) for line in lines[2:]]
+    board = [list(line.strip()) for line in lines[2:] if line.strip()]
     return algorithm, player, board
 
 
 # Helper function to print the board
-def print_board(board):
-    for row in board:
+def print_board(position):
+    for row in position.to_rows():
         print(" ".join(row))
     print()
 
 
-# Helper function to check valid moves
-def valid_moves(board):
-    return [c for c in range(COLUMNS) if board[0][c] == EMPTY]
-
-
-# Helper function to make a move
-def make_move(board, column, player):
-    for row in range(ROWS - 1, -1, -1):
-        if board[row][column] == EMPTY:
-            board[row][column] = player
-            return row, column
-
-
-def check_winner(board, last_move):
-    row, col = last_move
-    player = board[row][col]
-
-    # Direction vectors for (dx, dy) moves: horizontal, vertical, and two diagonals
-    directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
-
-    def count_in_direction(dx, dy):
-        """Counts consecutive pieces in a given direction (dx, dy) starting from (row, col)."""
-        count = 0
-        r, c = row, col
-        while 0 <= r < ROWS and 0 <= c < COLUMNS and board[r][c] == player:
-            count += 1
-            r += dx
-            c += dy
-        return count
-
-    for dx, dy in directions:
-        # Count pieces in both directions from the last move (including the last move itself)
-        total_count = count_in_direction(dx, dy) + count_in_direction(-dx, -dy) - 1
-        if total_count >= 4:
-            return 1 if player == YELLOW else -1
-
-    # Check for draw (no more valid moves)
-    if not valid_moves(board):
-        return 0  # Draw
-
-    # No winner or draw yet
-    return None
-
-
-# Simulate a random rollout (helper function for PMC/UCT)
-def random_rollout(board, player):
-    current_player = player
-    while True:
-        if not valid_moves(board):
-            return 0  # Draw
-        move = random.choice(valid_moves(board))
-        row, col = make_move(
-            board, move, current_player
-        )  # Ensure both row and column are returned
-
-        winner = check_winner(board, (row, col))  # Correctly pass the row, col pair
-        if winner is not None:
-            return winner
-        current_player = RED if current_player == YELLOW else YELLOW
-
-def uct_rollout(board, player, wi, ni, parent):
-    current_player = player
-    while True:
-        # print("hi")
-        if not valid_moves(board):
-            return 0  # Draw
-        move = (
-            ((wi[parent]) / ni[parent])
-            + math.sqrt(2) * math.sqrt(math.log(parent / ni[parent]))
-            if ni[parent] > 0
-            else random.choice(valid_moves(board))
-        )
-        # max(
-        # range(COLUMNS), key=lambda c: ((wi[c] / ni[c]) + math.sqrt(2) * math.sqrt(math.log(parent)/ni[c])) if ni[c] > 0 else random.choice(valid_moves(board))
-        # )
-        row, col = make_move(board, move, current_player)
-
-        winner = check_winner(board, (row, col))
-        if winner is not None:
-            return winner
-        current_player = RED if current_player == YELLOW else YELLOW
-
-def check_move_score(board, move):
-    row, col = move
-    player = board[row][col]
-
-    # Direction vectors for (dx, dy) moves: horizontal, vertical, and two diagonals
-    directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
-
-    def count_in_direction(dx, dy):
-        """Counts consecutive pieces in a given direction (dx, dy) starting from (row, col)."""
-        count = 0
-        r, c = row, col
-        while 0 <= r < ROWS and 0 <= c < COLUMNS and board[r][c] == player:
-            count += 1
-            r += dx
-            c += dy
-        return count
-
-    for dx, dy in directions:
-        # Count pieces in both directions from the last move (including the last move itself)
-        total_count = count_in_direction(dx, dy) + count_in_direction(-dx, -dy) - 1
-
-    return total_count
-
-# heuristic to prioritize moves based on more likely to win states
-def priority_rollout(board, player):
-    current_player = player
-    best_move = 0
-    best_score = float('-inf')
-    while True:
-        if not valid_moves(board):
-           return 0 #Draw
-        for move in valid_moves(board):
-            temp_board = [row[:] for row in board]
-            row, col = make_move(temp_board, move, current_player)
-            score = check_move_score(temp_board, (row, col))
-            if score < best_score:
-                best_score = score
-                best_move = move
-            else:
-                best_move = random.choice(valid_moves(board))
-        last_row, last_col = make_move(board, best_move, current_player)
-        winner = check_winner(board, (last_row, last_col))
-        if winner is not None:
-            return winner
-        current_player = RED if current_player == YELLOW else YELLOW
-
-
-
 # Algorithm 1: Uniform Random (UR)
-def uniform_random(board, player, output):
-
-    moves = valid_moves(board)
-
-    if not moves:
+def uniform_random(position, output, seed=None):
+    try:
+        selected_move = UniformRandom().search(position, seed=seed).move
+    except ValueError:
         print("No valid moves available.")
         return None
 
-    selected_move = random.choice(moves)
-
     if output == "Verbose":
         print("Initial board:")
-        print_board(board)
-
-    make_move(board, selected_move, player)
+        print_board(position)
 
     print(f"FINAL Move selected: {selected_move + 1}")
 
     if output != "None":
+        final_position = position.copy()
+        final_position.play(selected_move)
         print("Final board state:")
-        print_board(board)
+        print_board(final_position)
     return selected_move
 
 
-# Algorithm 2: Pure Monte Carlo Game Search (PMCGS)
-def pmcgs(board, player, simulations, output):
-    # wi and ni track the number of wins and the number of simulations for each column
-    wi = [0] * COLUMNS  # Wins for each column
-    ni = [0] * COLUMNS  # Number of simulations for each column
-
-    for sim in range(simulations):
-        if output == "Verbose":
-            print(f"Simulation {sim + 1}")
+# Helper function to print the value of each column, or 'Null' for invalid moves
+def print_column_values(values):
+    for col in range(len(values)):
+        if values[col] is None:  # No simulations for this column, means it's a full column
+            print(f"Column {col + 1}: Null")
+        else:
+            print(f"Column {col + 1}: {values[col]:.2f}")
 
-        for col in range(COLUMNS):
-            if board[0][col] != EMPTY:  # Skip full columns (invalid moves)
-                if output == "Verbose":
-                    print(f"Column {col + 1}: Null (full column)")
-                continue
 
-            # Make a temporary board copy and perform a move for the player
-            temp_board = [row[:] for row in board]  # Copy the board
-            make_move(temp_board, col, player)  # Only integer `col` is used here
+# Verbose output: the search reports its progress VERBOSE_SAMPLES times
+VERBOSE_SAMPLES = 10
 
-            # Perform a random rollout starting from the current board state
-            result = random_rollout(
-                temp_board, player
-            )  # Pass the player token as string
 
-            # Update wi and ni for this column
-            ni[col] += 1
-            wi[col] += result
+def verbose_sampler(simulations):
+    # returns (callback, every) for the searches
+    def sample(stats, wi, ni):
+        depth = f", mean depth {stats.mean_depth:.1f}" if stats.nodes_expanded else ""
+        print(f"After {stats.playouts} playouts ({stats.playouts_per_s:.0f}/s{depth}):")
+        print_column_values(column_values(wi, ni))
+        print()
 
-            if output == "Verbose":
-                print(f"wi: {wi[col]}\nni: {ni[col]}\nMove selected: {col + 1}\n")
+    every = max(simulations // VERBOSE_SAMPLES, 1) if simulations else SAMPLE_EVERY
+    return sample, every
 
-        if output == "Verbose":
-            print("NODE ADDED\n")  # Indicate a node addition
 
-    # Print the final values for each column (wi/ni) or 'Null' for invalid moves
+# Helper function to print the outcome of a search (a SearchResult) and return the
+# selected move; its stats are None when the book or the solver answered
+def report(result, output, time_limit_ms=None):
     if output == "Verbose" or output == "Brief":
-        for col in range(COLUMNS):
-            if ni[col] == 0:  # No simulations for this column, means it's a full column
-                print(f"Column {col + 1}: Null")
-            else:
-                value = wi[col] / ni[col]
-                print(f"Column {col + 1}: {value:.2f}")
-
-    # Select the column with the best wi/ni value (ignoring full columns)
-    best_move = max(
-        range(COLUMNS), key=lambda c: (wi[c] / ni[c]) if ni[c] > 0 else float("-inf")
+        print_column_values(result.values)
+        if output == "Verbose" and result.stats is not None:
+            print(result.stats.summary())
+        elif time_limit_ms is not None and result.stats is not None:
+            print(f"Playouts: {result.stats.playouts}")
+
+    print(f"FINAL Move selected: {result.move + 1}")
+    return result.move
+
+
+# Algorithms 2 and 3: PMCGS and UCT (or any engine of connect4.engines) search with
+# their own budget unless given one; Verbose prints the statistics so far every few
+# simulations
+def engine_move(position, engine, output, budget=None, seed=None):
+    budget = budget if budget is not None else engine.budget
+    callback, every = (
+        verbose_sampler(budget.simulations) if output == "Verbose" else (None, SAMPLE_EVERY)
     )
+    result = engine.search(position, budget, seed, callback, every)
+    return report(result, output, budget.movetime)
+
+
+# Engine options from the command line; a spec's own options take precedence
+def engine_defaults(args, simulations, solve_below):
+    return {
+        "simulations": simulations, "movetime": args.movetime, "seed": args.seed,
+        "rollout": args.rollout, "solve_below": solve_below, "workers": args.workers,
+        "parallel": args.parallel, "vectorized": args.vectorized, "rave": args.rave,
+        "fpu": args.fpu,
+    }
+
+
+# Search one position for the batch mode and the move server and return the result:
+# the move is 1-based like "FINAL Move selected"; values are in YELLOW's view (None for
+# full columns); playouts and the search statistics (as in SearchStats.as_dict) are
+# None when the book or the solver answered
+def analyse(position, engine, budget=None, seed=None):
+    start = time.perf_counter()
+    if position.result() is not None:
+        raise ValueError("The game is already over")
+
+    result = engine.search(position, budget, seed)
+    stats = result.stats
+    return {
+        "move": result.move + 1,
+        "values": result.values,
+        "playouts": stats.playouts if stats is not None else None,
+        "stats": stats.as_dict() if stats is not None else None,
+        "time_ms": round((time.perf_counter() - start) * 1000, 3),
+    }
+
+
+# Batch mode: one JSON result per position of a file or stdin; the algorithm line of
+# every position is an engine spec, so each position can name its own engine
+def analyse_position(defaults, book_path, win_length, index, algorithm, player, board):
+    result = {"index": index, "algorithm": algorithm, "player": player}
+    seed = defaults.get("seed")
+    if seed is not None:
+        seed += index  # a different but reproducible stream for every position
+    try:
+        engine = make_engine(
+            algorithm, **defaults, book=load_book(book_path) if book_path else None
+        )
+        result.update(analyse(Position.from_rows(board, player, win_length), engine, seed=seed))
+    except ValueError as error:
+        result["error"] = str(error)
+    return result
 
-    print(f"FINAL Move selected: {best_move + 1}")
-    return best_move
-
-
-# Algorithm 3: Upper Confidence Bound for Trees (UCT)
-def uct(board, player, simulations, output):
-    # wi and ni track the number of wins and the number of simulations for each column
-    wi = [0] * COLUMNS  # Wins for each column
-    ni = [0] * COLUMNS  # Number of simulations for each column
-
-    for sim in range(simulations):
-        if output == "Verbose":
-            print(f"Simulation {sim + 1}")
-
-        for col in valid_moves(board):
-            new_board = [row[:] for row in board]
-            make_move(new_board, col, player)
-            result = random_rollout(new_board, player)
-            ni[col] += 1
-            wi[col] += result
-            if output == "Verbose":
-                print(f"wi: {wi[col]}\nni: {ni[col]}\nMove selected: {col + 1}\n")
-
-        # UCB values calculations
-        ucb_values = [
-            (
-                wi[i] / ni[i] + math.sqrt(2 * math.log(sim + 1) / ni[i])
-                if ni[i] > 0
-                else float("inf")
-            )
-            for i in range(COLUMNS)
-        ]
-        selected_move = ucb_values.index(max(ucb_values))
-        if output == "Verbose":
-            print("NODE ADDED\n")
 
-    if output == "Verbose" or output == "Brief":
-        for col, ucb in enumerate(ucb_values):
-            print(f"Column {col + 1}: {ucb}")
-    
-    print(f"FINAL Move selected: {selected_move + 1}")
-    return selected_move
+def batch(source, defaults, workers=1, book_path=None, win_length=4):
+    # source is a file name or "-" for stdin; with several workers, positions are
+    # analysed in parallel (each by a single-process search) and written in input order
+    analyse = functools.partial(
+        analyse_position, {**defaults, "workers": 1}, book_path, win_length
+    )
+    if source == "-":
+        return run_batch(read_positions(sys.stdin), analyse, sys.stdout, workers)
+    with open(source, "r") as file:
+        return run_batch(read_positions(file), analyse, sys.stdout, workers)
+
+
+# Move server: every game is served by one worker process, which keeps its engine (and
+# so its tree) between moves.  The transposition table and the solver (both of fixed
+# size) are shared by the games of the worker on the same board size and line length:
+# they live as long as the worker, one pair per geometry, the least recently used
+# geometry's pair dropped beyond SERVER_GEOMETRIES
+SERVER_GAMES = 16  # Engines kept per worker, least recently used dropped first
+SERVER_GEOMETRIES = 4  # Table and solver pairs kept per worker
+_server_games = {}
+_server_tables = {}  # (width, height, connect) -> (TranspositionTable, Solver or None)
+
+
+def server_tables(geometry, solve):
+    size = (geometry.width, geometry.height, geometry.connect)
+    tables = _server_tables.pop(size, None)
+    if tables is None:
+        tables = (TranspositionTable(), Solver() if solve else None)
+    _server_tables[size] = tables
+    while len(_server_tables) > SERVER_GEOMETRIES:
+        del _server_tables[next(iter(_server_tables))]
+    return tables
+
+
+def server_move(defaults, book_path, request):
+    from connect4.server import request_position
+
+    position = request_position(request)
+    algorithm = request.get("algorithm", "UCT")
+    # the request's own budget replaces the server's
+    budget = None
+    if "simulations" in request or "movetime" in request:
+        budget = Budget(request.get("simulations"), request.get("movetime"))
+
+    game = request.get("game")
+    key = (game, algorithm, position.geometry.name)
+    engine = _server_games.pop(key, None) if game is not None else None
+    if engine is None:
+        table, solver = server_tables(position.geometry, defaults["solve_below"] is not None)
+        engine = make_engine(
+            algorithm, **defaults, book=load_book(book_path) if book_path else None,
+            table=table, solver=solver,
+        )
+    if game is not None:
+        _server_games[key] = engine
+        while len(_server_games) > SERVER_GAMES:
+            del _server_games[next(iter(_server_games))]
+    return analyse(position, engine, budget, request.get("seed"))
+
 
-def player_helper(board, move, player):
-    row, col = make_move(board, move, player)
-    win_check = check_winner(board, (row, col))
-    return board, win_check
+def player_helper(position, move):
+    position.play(move)
+    win_check = position.result()
+    return position, win_check
 
 
-def play_human_player(board):
+def play_human_player(position, time_limit_ms=1000, book=None, client=None):
     winner = False
+    # kept between moves so the tree (and its transposition table) is reused;
+    # with a move server client, the server keeps the tree of this game instead
+    engine = make_engine("uct", movetime=time_limit_ms, book=book) if client is None else None
+    game = f"human-{os.getpid()}"
     print("Human player: R, Computer player: Y")
-    while True:
-        moves = valid_moves(board)
-        if not valid_moves(board):
-            print("Draw")
-            break
-        print("Current Board:")
-        print_board(board)
-        #human player move
-        player_move = int(input("Enter a move(1-7): "))
-        while player_move-1 not in moves:
-            print("Illegal move chosen")
-            player_move = int(input("Enter a move(1-7): "))
-        board, winner = player_helper(board, player_move-1, RED)
-        #check if human player has made winning move
-        if winner:
-            print_board(board)
-            print("RED WINS")
-            break
-        #start of computer move
-        moves = valid_moves(board)
-        if not valid_moves(board):
-            print("Draw")
-            break
-        print("Computer is thinking...")
-        computer_move = pmcgs(board, YELLOW, 10000, "None") #uses uct to decide the computer move
-        print(f"Computer chose move: {computer_move+1}")
-        board, winner = player_helper(board, computer_move, YELLOW)
-        #check if computer player has made winning move
-        if winner:
-            print_board(board)
-            print("YELLOW WINS")
-            break
-
-def tournament(board, players, output):
-    playerWins = 0
-    player2Wins = 0
-    draws = 0
-    # keeps track of the player combinations seen
-    seen = []
-    with open("tournament_results_easy.txt", "w") as result_file:
-        for player in players:
-            for player2 in players:
-                if seen.count(player + player2) > 0:
-                    continue
-                if seen.count(player2 + player) > 0:
-                    continue
-                seen.append(player + player2)
-                seen.append(player2 + player)
-                for sim in range(100):
-                    curr_board = [row[:] for row in board]
-                    winner = play(curr_board, player, player2, simulations, output)
-                    if winner == 1:
-                        playerWins += 1
-                    elif winner == -1:
-                        player2Wins += 1
-                    else:
-                        draws += 1
-                result_file.write(
-                    f"{player} had {playerWins} wins against {player2} who had {player2Wins} wins\n"
+    try:
+        while True:
+            moves = position.legal_moves()
+            if not moves:
+                print("Draw")
+                break
+            print("Current Board:")
+            print_board(position)
+            #human player move
+            prompt = f"Enter a move(1-{position.geometry.width}): "
+            player_move = int(input(prompt))
+            while player_move-1 not in moves:
+                print("Illegal move chosen")
+                player_move = int(input(prompt))
+            position, winner = player_helper(position, player_move-1)
+            #check if human player has made winning move
+            if winner:
+                print_board(position)
+                print("RED WINS")
+                break
+            #start of computer move
+            if not position.legal_moves():
+                print("Draw")
+                break
+            print("Computer is thinking...")
+            #uses uct to decide the computer move, thinking for time_limit_ms milliseconds
+            if client is not None:
+                from connect4.server import position_fields
+
+                answer = client.request(
+                    algorithm="UCT", game=game, movetime=time_limit_ms, **position_fields(position)
                 )
-                result_file.write(f"There were {draws} draws\n")
-                playerWins = 0
-                player2Wins = 0
-                draws = 0
+                computer_move = answer["move"] - 1
+            else:
+                computer_move = engine_move(position, engine, "None")
+            print(f"Computer chose move: {computer_move+1}")
+            position, winner = player_helper(position, computer_move)
+            #check if computer player has made winning move
+            if winner:
+                print_board(position)
+                print("YELLOW WINS")
+                break
+    finally:
+        if engine is not None:
+            engine.reset()  # Drop the tree (and its table) now, not when the process ends
+
+def tournament_game(position, player, player2, output, book_path=None, seed=None):
+    # the book is passed by path: each worker process maps it once; returns the result
+    # and the game's record (moves, specs, per-move time and playouts)
+    book = load_book(book_path) if book_path else None
+    recorder = GameRecorder(position, [player_spec(player), player_spec(player2)])
+    return play(position.copy(), player, player2, output, book, seed, recorder), recorder.record()
+
+
+# Every tournament game gets its own seed, derived from the tournament's master seed and
+# the game id and stored with the game's record: rerunning with the same --seed replays
+# every game exactly, in any order and with any number of workers
+def game_seeds(seed, game_ids):
+    if seed is None:
+        seed = fresh_seed()
+    return seed, {game_id: derive_seed(seed, game_id) for game_id in game_ids}
+
+
+def tournament(position, players, output, results_path="tournament_results_easy.jsonl", workers=1,
+               book_path=None, seed=None, records_path=None):
+    # the first player moves first, so its wins have the value of the side to move
+    first_win = WIN_VALUES[position.turn]
+    # every pairing (each combination once, including self-play) plays 100 games;
+    # games already in results_path are skipped, so an interrupted run can resume
+    pairings = [
+        (player, player2) for i, player in enumerate(players) for player2 in players[i:]
+    ]
+    game_ids = [
+        (player, player2, f"{player}|{player2}|{game}")
+        for player, player2 in pairings
+        for game in range(100)
+    ]
+    seed, seeds = game_seeds(seed, [game_id for _, _, game_id in game_ids])
+    games = [
+        (
+            game_id,
+            {"player": player, "player2": player2, "seed": seeds[game_id]},
+            (position, player, player2, output, book_path, seeds[game_id]),
+        )
+        for player, player2, game_id in game_ids
+    ]
+    records = run_games(games, tournament_game, results_path, workers, records_path)
+
+    summary_path = os.path.splitext(results_path)[0] + ".txt"
+    outcomes = {}
+    with open(summary_path, "w") as result_file:
+        result_file.write(f"Seed: {seed}\n")
+        for player, player2 in pairings:
+            results = [
+                record["result"]
+                for record in records
+                if record["player"] == player and record["player2"] == player2
+            ]
+            playerWins = results.count(first_win)
+            player2Wins = results.count(-first_win)
+            draws = len(results) - playerWins - player2Wins
+            result_file.write(
+                f"{player} had {playerWins} wins against {player2} who had {player2Wins} wins\n"
+            )
+            result_file.write(f"There were {draws} draws\n")
+            outcomes[(player, player2)] = (playerWins, draws, player2Wins)
+        # the first player always moves first here, so these ratings include that edge
+        result_file.write("\nElo ratings (95% error bars):\n")
+        for line in format_ratings(fit_ratings(outcomes)):
+            result_file.write(line + "\n")
+
+
+# Adaptive tournament: every pairing of different players plays rounds of games, the
+# players taking turns to move first, until its stopping rule decides the pairing or it
+# reaches max_games; decided pairings stop early, so games go where results are close
+ADAPTIVE_ROUND = 10
+ADAPTIVE_MAX_GAMES = 200
+
+
+def adaptive_tournament(position, players, output, results_path, workers=1, book_path=None,
+                        stop="sprt", max_games=ADAPTIVE_MAX_GAMES, seed=None, records_path=None):
+    if seed is None:
+        seed = fresh_seed()
+    decide = STOPPING_RULES[stop]
+    first_win = WIN_VALUES[position.turn]
+    pairings = list(itertools.combinations(players, 2))
+    played = dict.fromkeys(pairings, 0)
+    outcomes = dict.fromkeys(pairings, (0, 0, 0))
+    undecided = list(pairings)
+    while undecided:
+        games = []
+        for player, player2 in undecided:
+            start = played[(player, player2)]
+            played[(player, player2)] = min(start + ADAPTIVE_ROUND, max_games)
+            for game in range(start, played[(player, player2)]):
+                first, second = (player, player2) if game % 2 == 0 else (player2, player)
+                game_id = f"adaptive|{player}|{player2}|{game}"
+                game_seed = derive_seed(seed, game_id)
+                games.append((
+                    game_id,
+                    {"pairing": [player, player2], "game": game, "player": first,
+                     "player2": second, "seed": game_seed},
+                    (position, first, second, output, book_path, game_seed),
+                ))
+        records = run_games(games, tournament_game, results_path, workers, records_path)
+        outcomes = adaptive_outcomes(records, played, first_win)
+        undecided = [
+            pairing for pairing in undecided
+            if played[pairing] < max_games and decide(*outcomes[pairing]) is None
+        ]
+
+    summary_path = os.path.splitext(results_path)[0] + ".txt"
+    with open(summary_path, "w") as result_file:
+        result_file.write(f"Seed: {seed}\n")
+        for (player, player2), (wins, draws, losses) in outcomes.items():
+            elo, low, high = elo_interval(wins, draws, losses)
+            decision = decide(wins, draws, losses)
+            if decision is None:
+                verdict = "undecided"
+            elif decision == 0:
+                verdict = "no significant difference"
+            else:
+                verdict = f"{player if decision > 0 else player2} is stronger"
+            result_file.write(
+                f"{player} vs {player2}: {wins + draws + losses} games, {wins} wins, "
+                f"{draws} draws, {losses} losses, Elo {elo:+.0f} [{low:+.0f}, {high:+.0f}], "
+                f"{verdict}\n"
+            )
+        result_file.write("\nElo ratings (95% error bars):\n")
+        for line in format_ratings(fit_ratings(outcomes)):
+            result_file.write(line + "\n")
+    with open(summary_path, "r") as result_file:
+        print(result_file.read(), end="")
+
+
+def adaptive_outcomes(records, played, first_win):
+    # (wins, draws, losses) of the first player of each pairing over its first
+    # played[pairing] games, so that a resumed run takes the same decisions
+    outcomes = {}
+    for (player, player2), count in played.items():
+        wins = draws = losses = 0
+        for record in records:
+            if record.get("pairing") != [player, player2] or record["game"] >= count:
+                continue
+            if record["result"] == 0:
+                draws += 1
+            elif (record["result"] == first_win) == (record["player"] == player):
+                wins += 1
+            else:
+                losses += 1
+        outcomes[(player, player2)] = (wins, draws, losses)
+    return outcomes
+
+
+# Tournament players: the classic names stand for these engine specs, the same as
+# tournament.py's ALGORITHMS; any other name is taken as a spec itself (see --players)
+TOURNAMENT_PLAYERS = {
+    "UR": "ur",
+    "PMCGS(5)": "pmcgs:sims=5,solve=-1",
+    "PMCGS(100)": "pmcgs:sims=100,solve=-1",
+    "UCT(5)": "uct:sims=5,c=1.41,solve=-1",
+    "UCT(100)": "uct:sims=100,c=1.41,solve=-1",
+}
+
+
+def player_spec(player):
+    return TOURNAMENT_PLAYERS.get(player, player)
 
 
-def play(board, player, player2, simulations, output):
-    curr = player
-    color = RED
+def player_engine(player, book=None):
+    return make_engine(player_spec(player), book=book)
+
+
+def play(position, player, player2, output, book=None, seed=None, recorder=None):
+    # one engine per side, so each UCT tree is re-rooted at the moves played since its
+    # last search; every move is searched with its own seed drawn from the game's stream
+    # and, with a GameRecorder, recorded with its search time and playouts
+    engines = [player_engine(player, book), player_engine(player2, book)]
+    side = 0
+    rng = random.Random(seed)
     while True:
-        if curr == "UR":
-            move = uniform_random(board, color, output)
-        elif curr == "PMCGS(500)":
-            move = pmcgs(board, color, 5, output)
-        elif curr == "PMCGS(10000)":
-            move = pmcgs(board, color, 100, output)
-        elif curr == "UCT(500)":
-            move = uct(board, color, 5, output)
-        elif curr == "UCT(10000)":
-            move = uct(board, color, 100, output)
-
-        if move is None:
+        move_seed = rng.getrandbits(SEED_BITS)
+        if not position.legal_moves():
             print("Draw")
-            return 0  
+            return 0
 
-        result = make_move(board, move, color)  
-        if result is None:
+        start = time.perf_counter()
+        result = engines[side].search(position, seed=move_seed)
+        seconds = time.perf_counter() - start
+        if output != "None":
+            report(result, output)
+        move = result.move
+
+        if not position.can_play(move):
             print("Invalid move")
             return 0
+        if recorder is not None:
+            recorder.add(move, seconds, result.stats)
 
-        row, col = result
-        winner = check_winner(board, (row, col))
+        position.play(move)
+        winner = position.result()
 
         if winner is not None:
             return winner
 
-        curr = player2 if curr == player else player
-        color = YELLOW if color == RED else RED
+        side = 1 - side
 
 
-if __name__ == "__main__":
-    tournament_experiment_mode = False
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        usage="python <script> <input_file> <output_mode> <simulations> [tournament]\n"
+        "       python <script> --server ADDRESS [--movetime MS] [options]"
+    )
+    parser.add_argument("input_file", nargs="?")
+    parser.add_argument("output_mode", nargs="?", choices=["Verbose", "Brief", "None"])
+    parser.add_argument("simulations", nargs="?", type=int)
+    parser.add_argument("tournament", nargs="?", help="run the round robin tournament")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="processes searching in parallel (root parallelism) for PMCGS/UCT, "
+        "or games (positions) played (analysed) in parallel in a tournament (batch)",
+    )
+    parser.add_argument(
+        "--batch", action="store_true",
+        help="analyse every position in input_file ('-' for stdin) and print one JSON "
+        "line per position; output_mode is ignored",
+    )
+    parser.add_argument(
+        "--rollout", choices=sorted(ROLLOUTS), default="random",
+        help="rollout policy for PMCGS/UCT: uniformly random moves, or heavy "
+        "(win if possible, else block, else centre-weighted random)",
+    )
+    parser.add_argument(
+        "--vectorized", action="store_true",
+        help="PMCGS: run the rollouts of each column as one NumPy batch",
+    )
+    parser.add_argument(
+        "--parallel", choices=["root", "tree"], default="root",
+        help="UCT with several workers: independent trees (root) or one shared tree (tree)",
+    )
+    parser.add_argument(
+        "--rave", type=float, metavar="K",
+        help="UCT: blend RAVE (all-moves-as-first) values into selection, weighted "
+        f"sqrt(K / (3n + K)) for a child visited n times (e.g. {RAVE_EQUIVALENCE:g}; "
+        "off by default)",
+    )
+    parser.add_argument(
+        "--fpu", type=float, metavar="V",
+        help="UCT: first-play urgency, the score of unvisited children (-1 to 1) instead "
+        "of visiting every child once first",
+    )
+    parser.add_argument(
+        "--movetime", type=int, metavar="MS",
+        help="search each move for MS milliseconds instead of a fixed simulation count "
+        "(HUMAN: the computer's thinking time, default 1000)",
+    )
+    parser.add_argument(
+        "--solve-below", type=int, default=SOLVE_BELOW, metavar="N",
+        help="PMCGS/UCT: solve positions with at most N empty cells exactly "
+        f"(default {SOLVE_BELOW}; -1 disables the solver)",
+    )
+    parser.add_argument(
+        "--book", default=BOOK_PATH, metavar="FILE",
+        help="opening book built by connect4.book, used for PMCGS/UCT/HUMAN/tournament "
+        f"positions it contains (default {BOOK_PATH}, ignored if missing)",
+    )
+    parser.add_argument(
+        "--seed", type=int,
+        help="seed for reproducible searches, or the master seed of a tournament (each "
+        "game's seed is derived from it and logged with the game)",
+    )
+    parser.add_argument(
+        "--results",
+        help="tournament game log (JSONL); finished games in it are not replayed (default "
+        "tournament_results_easy.jsonl, or tournament_results_adaptive.jsonl with --adaptive)",
+    )
+    parser.add_argument(
+        "--records", metavar="FILE",
+        help="tournament: compressed log every game is appended to with its moves, engine "
+        "specs, seed and per-move time and playouts (default: the --results name with "
+        ".games.gz); python -m connect4.records replays it",
+    )
+    parser.add_argument(
+        "--adaptive", nargs="?", const="sprt", choices=sorted(STOPPING_RULES),
+        help="tournament: stop each pairing once the SPRT (default) or the confidence "
+        "interval of its score decides it, with colours alternating",
+    )
+    parser.add_argument(
+        "--max-games", type=int, default=ADAPTIVE_MAX_GAMES, metavar="N",
+        help=f"adaptive tournament: games per pairing at most (default {ADAPTIVE_MAX_GAMES})",
+    )
+    parser.add_argument(
+        "--players", nargs="+", metavar="SPEC",
+        help="tournament players: engine specs such as ur, pmcgs:sims=50 or "
+        "uct:sims=200,c=0.8 (default: " + ", ".join(TOURNAMENT_PLAYERS) + ")",
+    )
+    parser.add_argument(
+        "--win-length", type=int, default=4, metavar="N",
+        help="pieces in a row needed to win (default 4); the board size is that of the "
+        "input board, e.g. 8x7 or 9x7",
+    )
+    parser.add_argument(
+        "--server", metavar="ADDRESS",
+        help="serve moves over a Unix socket path or HOST:PORT (JSON lines) until "
+        "interrupted, with --workers processes; --movetime is the default budget",
+    )
+    parser.add_argument(
+        "--connect", metavar="ADDRESS",
+        help="PMCGS/UCT/HUMAN: ask the move server at ADDRESS instead of searching here",
+    )
+    args = parser.parse_args(argv)
+    if args.server is None and args.simulations is None:
+        parser.error("input_file, output_mode and simulations are required")
+    return args
 
-    if len(sys.argv) != 4:
-        if len(sys.argv) == 5:
-            tournament_experiment_mode = True
-        else:    
-            print("Usage: python <script> <input_file> <output_mode> <simulations>")
-            sys.exit(1)
 
-    input_file = sys.argv[1]
-    output_mode = sys.argv[2]
-    simulations = int(sys.argv[3])
+if __name__ == "__main__":
+    if getattr(sys, "frozen", False):
+        import multiprocessing
+
+        multiprocessing.freeze_support()  # worker processes of the PyInstaller build
+    args = parse_args()
+    output_mode = args.output_mode
+    # a move time replaces the simulation count
+    simulations = args.simulations if args.movetime is None else None
+    solve_below = args.solve_below if args.solve_below >= 0 else None
+    defaults = engine_defaults(args, simulations, solve_below)
+
+    if args.server:
+        from connect4.server import serve
+
+        serve(args.server, functools.partial(server_move, defaults, args.book), args.workers)
+        sys.exit(0)
+
+    if args.batch:
+        try:
+            batch(args.input_file, defaults, args.workers, args.book, args.win_length)
+        except ValueError as error:
+            print(f"Invalid batch input: {error}", file=sys.stderr)
+            sys.exit(1)
+        sys.exit(0)
 
-    algorithm, player, board = read_board_from_file(input_file)
+    algorithm, player, board = read_board_from_file(args.input_file)
+    try:
+        position = Position.from_rows(board, player, args.win_length)
+    except ValueError as error:
+        print(f"Invalid board: {error}")
+        sys.exit(1)
+    if args.vectorized and position.geometry.width * position.geometry.stride > 64:
+        print(f"--vectorized: a {position.geometry.name} board does not fit in 64 bits")
+        sys.exit(1)
 
-    if tournament_experiment_mode:
+    if args.tournament:
         print("Round Robin Tournament")
-        players = ["UR", "PMCGS(500)", "PMCGS(10000)", "UCT(500)", "UCT(10000)"]
-        tournament(board, players, "None")
+        players = args.players or list(TOURNAMENT_PLAYERS)
+        try:
+            for player in players:
+                parse_spec(TOURNAMENT_PLAYERS.get(player, player))
+        except ValueError as error:
+            print(f"Invalid player: {error}")
+            sys.exit(1)
+        results_path = args.results or (
+            "tournament_results_adaptive.jsonl" if args.adaptive
+            else "tournament_results_easy.jsonl"
+        )
+        records_path = args.records or os.path.splitext(results_path)[0] + ".games.gz"
+        if args.adaptive:
+            adaptive_tournament(
+                position, players, "None", results_path, args.workers, args.book,
+                args.adaptive, args.max_games, args.seed, records_path,
+            )
+        else:
+            tournament(
+                position, players, "None", results_path, args.workers, args.book, args.seed,
+                records_path,
+            )
         sys.exit(1)
 
-    if algorithm == "UR":
-        uniform_random(
-            board, player, output_mode
-        )  # ignores simulations due to the number not mattering for Uniform Random
-    elif algorithm == "PMCGS":
-        pmcgs(board, player, simulations, output_mode)
-    elif algorithm == "UCT":
-        uct(board, player, simulations, output_mode)
-    elif algorithm == "HUMAN":
-        play_human_player(board)
+    if algorithm == "HUMAN":
+        if args.connect:
+            from connect4.server import MoveClient
+
+            with MoveClient(args.connect) as client:
+                play_human_player(position, args.movetime or 1000, load_book(args.book), client)
+        else:
+            play_human_player(position, args.movetime or 1000, load_book(args.book))
         #ignores the player, simulations and output_mode. starts with an empty board
+        sys.exit(0)
+
+    # the algorithm line is an engine spec: UR, PMCGS, UCT or e.g. uct:sims=2000,c=0.8
+    try:
+        engine = make_engine(algorithm, **defaults, book=load_book(args.book))
+    except ValueError as error:
+        print(f"Invalid engine: {error}")
+        sys.exit(1)
+    if isinstance(engine, UniformRandom):
+        # ignores simulations due to the number not mattering for Uniform Random
+        uniform_random(position, output_mode, args.seed)
+    elif args.connect:
+        # the server searches; its answer is printed like a local search
+        from connect4.server import MoveClient, position_fields
+
+        with MoveClient(args.connect) as client:
+            budget = {"simulations": simulations, "movetime": args.movetime}
+            answer = client.request(algorithm=algorithm, **budget, **position_fields(position))
+        stats = SearchStats.from_dict(answer["stats"]) if answer.get("stats") else None
+        report(SearchResult(answer["move"] - 1, answer["values"], stats), output_mode,
+               args.movetime)
     else:
-        print(f"Unknown algorithm: {algorithm}")
-        sys.exit(1)
\ No newline at end of file
+        engine_move(position, engine, output_mode)
@@ -0,0 +1,40 @@
+import io
+
+import pytest
+
+from connect4.batch import read_positions, run_batch
+
+
+def test_blocks_and_one_line_positions_mix():
+    lines = [
+        "# A block, then a one-line position",
+        "UR",
+        "R",
+        "OOO",
+        "ORY",
+        "",
+        "uct:sims=10 Y OOO/RRY",
+    ]
+    assert list(read_positions(lines)) == [
+        ("UR", "R", [list("OOO"), list("ORY")]),
+        ("uct:sims=10", "Y", [list("OOO"), list("RRY")]),
+    ]
+
+
+@pytest.mark.parametrize("lines, message", [
+    (["UR", "R", "OOOO", "ORY"], "line 1: board rows differ in length"),
+    (["UR"], "line 1: position block ends early"),
+    (["UR R"], "line 1: expected ALGORITHM PLAYER ROWS or an algorithm line"),
+    (["UR R OOO/RRY", "", "UR R OOO/RXY"], "line 3: expected rows of O, R and Y cells"),
+])
+def test_errors_name_the_line_of_the_position(lines, message):
+    with pytest.raises(ValueError, match=f"^{message}$"):
+        list(read_positions(lines))
+
+
+def test_positions_before_an_error_are_answered():
+    output = io.StringIO()
+    positions = read_positions(["UR R OOO/RRY", "UR R OOO/RR"])
+    with pytest.raises(ValueError, match="line 2"):
+        run_batch(positions, lambda index, *position: index, output)
+    assert output.getvalue() == "0\n"
@@ -0,0 +1,22 @@
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from connect4.batch_rollout import TIMED_BATCH, pmcgs_batch_statistics  # noqa: E402
+from connect4.bitboard import Position  # noqa: E402
+
+
+@pytest.mark.parametrize("simulations", [100, TIMED_BATCH, 2 * TIMED_BATCH + 52])
+def test_timed_search_stops_at_the_simulation_budget(simulations):
+    position = Position()
+    position.play(3)
+    wi, ni = pmcgs_batch_statistics(position, simulations, 1, time.monotonic() + 60)
+    assert ni == [simulations] * position.geometry.width
+    assert all(-count <= total <= count for total, count in zip(wi, ni))
+
+
+def test_untimed_search_runs_every_simulation_at_once():
+    wi, ni = pmcgs_batch_statistics(Position(), 50, 1)
+    assert ni == [50] * 7
@@ -0,0 +1,69 @@
+from connect4.bitboard import RED, YELLOW, Position, mirror_column, mirror_columns
+from connect4.book import OpeningBook, evaluate, opening_positions, write_book
+
+
+def board(*rows, player=RED):
+    """A standard position from its bottom rows (top row first), empty above."""
+    rows = ["OOOOOOO"] * (6 - len(rows)) + list(rows)
+    return Position.from_rows([list(row) for row in rows], player)
+
+
+def played(*moves):
+    position = Position()
+    for col in moves:
+        position.play(col)
+    return position
+
+
+def make_book(tmp_path, positions):
+    path = tmp_path / "book.bin"
+    entries = dict(evaluate(position, 200, seed) for seed, position in enumerate(positions))
+    write_book(path, entries)
+    return OpeningBook(str(path))
+
+
+def test_lookup_returns_the_stored_entry(tmp_path):
+    position = played(3)
+    book = make_book(tmp_path, [position])
+    move, values = book.probe(position)
+    expected_move, expected_values = evaluate(position, 200, 0)[1]
+    assert move == expected_move
+    assert values == [round(value, 4) for value in expected_values]
+    assert book.probe(played(3, 3)) is None
+
+
+def test_mirror_image_is_found_in_its_own_orientation(tmp_path):
+    position = played(1, 3)
+    book = make_book(tmp_path, [position])
+    move, values = book.probe(position)
+    mirrored = played(mirror_column(1), mirror_column(3))
+    assert book.probe(mirrored) == (mirror_column(move), mirror_columns(values))
+
+
+def test_other_side_to_move_is_not_found(tmp_path):
+    position = played(3, 3)
+    book = make_book(tmp_path, [position])
+    assert book.probe(position) is not None
+    swapped = Position.from_rows(position.to_rows(), YELLOW)
+    assert book.probe(swapped) is None
+
+
+def test_unsearched_columns_have_no_value():
+    # YELLOW wins at once in column 4: the root is proven before every column is tried
+    position = board("OOOOROO", "YYYORRR", player=YELLOW)
+    _, (move, values) = evaluate(position, 500, 1)
+    assert move == 3 and values[3] == 1
+    assert 0.0 not in values
+
+
+def test_entries_do_not_depend_on_earlier_positions():
+    first, second = played(3), played(2, 4)
+    alone = evaluate(second, 300, 5)
+    evaluate(first, 300, 4)
+    assert evaluate(second, 300, 5) == alone
+
+
+def test_opening_positions_share_mirror_pairs():
+    positions = opening_positions(1)
+    assert len(positions) == 1 + 4  # The empty board, then columns 1-4
+    assert len({position.key for position in positions}) == len(positions)
@@ -0,0 +1,68 @@
+import random
+
+from connect4.bitboard import PLAYERS, RED, WIN_VALUES, YELLOW, Position
+from connect4.mcts import UCTSearch
+from connect4.rollouts import random_rollout
+
+
+def board(*rows, player=RED):
+    """A standard position from its bottom rows (top row first), empty above."""
+    rows = ["OOOOOOO"] * (6 - len(rows)) + list(rows)
+    return Position.from_rows([list(row) for row in rows], player)
+
+
+def test_rollout_reward_belongs_to_the_player_who_moved_into_the_leaf():
+    # The rollout plays on (here one YELLOW move) and then reports a RED win: the child
+    # RED moved into must be credited with a win, whoever made the rollout's last move
+    def red_wins_after_one_move(position, rng):
+        position.play(position.legal_moves()[0])
+        return WIN_VALUES[PLAYERS.index(RED)]
+
+    search = UCTSearch(red_wins_after_one_move, solver=None, rng=random.Random(1))
+    search.search(Position(), 1)
+    store = search.store
+    (child,) = [child for child in store.children(search.root) if store.visits[child]]
+    assert store.values[child] == 1
+    wi, ni = search.root_statistics()
+    assert wi[store.moves[child]] == WIN_VALUES[PLAYERS.index(RED)]  # In YELLOW's view
+
+
+def test_uct_prefers_the_block_of_a_threat_without_the_solver():
+    # YELLOW threatens to complete the bottom row in column 6 (index 5)
+    position = board("RRYYYOR")
+    search = UCTSearch(random_rollout, solver=None, solve_below=None, rng=random.Random(2))
+    search.search(position, 3000)
+    wi, ni = search.root_statistics()
+    means = {col: wi[col] / ni[col] for col in position.legal_moves() if ni[col]}
+    assert min(means, key=means.get) == 5  # RED minimises YELLOW's view
+
+
+def test_one_move_win_backs_up_as_a_win_for_the_side_to_move():
+    position = board("OOOOROO", "YYYORRR", player=YELLOW)
+    search = UCTSearch(random_rollout, solver=None, solve_below=None, rng=random.Random(3))
+    assert search.search(position, 500) == 3
+    wi, ni = search.root_statistics()
+    assert wi[3] / ni[3] == 1
+
+
+def test_the_mirror_of_an_expanded_move_keeps_its_subtree():
+    search = UCTSearch(random_rollout, rng=random.Random(3))
+    position = Position()
+    search.search(position, 400)
+    store = search.store
+    (left,) = [child for child in store.children(search.root) if store.moves[child] == 1]
+    visits = store.visits[left]
+    expected = {
+        6 - store.moves[child]: store.visits[child] for child in store.children(left)
+    }
+
+    position.play(5)  # Only columns 0-3 were expanded at the empty board
+    search.sync(position)
+    store = search.store
+    assert store.visits[search.root] == visits > 0
+    assert {
+        store.moves[child]: store.visits[child] for child in store.children(search.root)
+    } == expected
+
+    move = search.search(position, 100)
+    assert position.can_play(move)
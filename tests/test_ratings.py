@@ -0,0 +1,27 @@
+import math
+
+import pytest
+
+from connect4.ratings import elo_difference, expected_score, sprt_bounds, sprt_decision
+
+
+def test_sprt_bounds():
+    lower, upper = sprt_bounds(0.05, 0.05)
+    assert lower == pytest.approx(math.log(0.05 / 0.95))
+    assert upper == pytest.approx(math.log(0.95 / 0.05))
+    assert sprt_bounds(0.05, 0.1)[0] == pytest.approx(math.log(0.1 / 0.95))
+
+
+@pytest.mark.parametrize("wins, draws, losses, decision", [
+    (2, 0, 1, None),  # Too few games either way
+    (80, 10, 10, 1),
+    (10, 10, 80, -1),
+    (200, 600, 200, 0),  # Even over many games: less than ELO1 apart
+])
+def test_sprt_decision(wins, draws, losses, decision):
+    assert sprt_decision(wins, draws, losses) == decision
+
+
+def test_elo_difference_inverts_expected_score():
+    for elo in (-300, -50, 0, 120):
+        assert elo_difference(expected_score(elo)) == pytest.approx(elo)
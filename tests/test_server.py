@@ -0,0 +1,42 @@
+import asyncio
+
+from connect4.server import MoveServer, parse_address, request_position
+
+
+def legal_moves(request):
+    """A handler answering with the open columns of the request's position."""
+    return {"legal": [col + 1 for col in request_position(request).legal_moves()]}
+
+
+def answer(line):
+    server = MoveServer(legal_moves)
+    try:
+        return asyncio.run(server.answer(line))
+    finally:
+        server.close()
+
+
+def test_answers_echo_the_request_id():
+    assert answer('{"id": 7, "moves": [4, 4, 4, 4, 4, 4]}') == {
+        "id": 7, "legal": [1, 2, 3, 5, 6, 7],
+    }
+
+
+def test_a_move_into_a_full_column_is_an_error():
+    assert answer('{"id": 8, "moves": [4, 4, 4, 4, 4, 4, 4]}') == {
+        "id": 8, "error": "Illegal move: 4",
+    }
+    assert answer('{"moves": [8]}') == {"error": "Illegal move: 8"}
+
+
+def test_malformed_requests_are_errors():
+    assert answer("[1, 2]")["error"].startswith("Invalid request")
+    assert answer('{"board": "OOO/RR", "player": "R"}') == {
+        "error": "Expected moves, or a board of rows of one length",
+    }
+
+
+def test_addresses():
+    assert parse_address(":8765") == ("tcp", "127.0.0.1", 8765)
+    assert parse_address("localhost:8765") == ("tcp", "localhost", 8765)
+    assert parse_address("/tmp/connect4.sock") == ("unix", "/tmp/connect4.sock")
@@ -0,0 +1,72 @@
+import random
+
+from connect4.bitboard import RED, YELLOW, Position, get_geometry
+from connect4.solver import Solver
+
+
+def board(*rows, player=RED):
+    """A standard position from its bottom rows (top row first), empty above."""
+    rows = ["OOOOOOO"] * (6 - len(rows)) + list(rows)
+    return Position.from_rows([list(row) for row in rows], player)
+
+
+def minimax(position):
+    """Value for the side to move by plain exhaustive search."""
+    best = None
+    for col in list(position.legal_moves()):
+        position.play(col)
+        value = 1 if position.last_move_won() else -minimax(position)
+        position.undo()
+        best = value if best is None else max(best, value)
+    return 0 if best is None else best
+
+
+def random_positions(geometry, count, plies, seed):
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        position = Position(geometry=geometry)
+        for _ in range(plies):
+            position.play(rng.choice(position.legal_moves()))
+            if position.last_move_won() or not position.legal_moves():
+                break
+        else:
+            positions.append(position)
+    return positions
+
+
+def test_immediate_win():
+    position = board("OOOOROO", "YYYORRR", player=YELLOW)
+    solver = Solver()
+    assert solver.value(position) == 1
+    assert solver.best_move(position) == (3, 1)
+    assert solver.column_values(position)[3] == 1
+
+
+def test_every_move_but_the_block_loses():
+    position = board("RRYYYOR")  # YELLOW completes the bottom row in column 6 unless blocked
+    solver = Solver()
+    for col in position.legal_moves()[:]:
+        if col != 5:
+            position.play(col)
+            assert solver.value(position) == 1  # For YELLOW, to move
+            position.undo()
+
+
+def test_matches_exhaustive_search_on_a_small_board():
+    geometry = get_geometry(4, 4, 3)
+    solver = Solver()
+    for position in random_positions(geometry, 30, 7, seed=1):
+        assert solver.value(position) == minimax(position.copy())
+
+
+def test_side_to_move_is_part_of_the_table_key():
+    # The same pieces with either side to move are different positions; a shared table
+    # must not answer one with the other's value
+    geometry = get_geometry(4, 4, 3)
+    solver = Solver()
+    for position in random_positions(geometry, 20, 6, seed=2):
+        rows = position.to_rows()
+        for player in (RED, YELLOW):
+            swapped = Position.from_rows(rows, player, 3)
+            assert solver.value(swapped) == minimax(swapped.copy())
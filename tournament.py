@@ -1,265 +1,197 @@
+import argparse
+import os
 import random
-import math
-import numpy as np
-import matplotlib.pyplot as plt
+import time
 
-
-# Constants
-ROWS, COLS = 6, 7  # Board dimensions
-WINNING_LENGTH = 4  # Connect Four win condition
-RED = "R"  # Red player is the "Min" player
-YELLOW = "Y"  # Yellow player is the "Max" player
-EMPTY = "O"  # Empty space
+from connect4.bitboard import RED, STANDARD, YELLOW, WIN_VALUES, Position, get_geometry
+from connect4.book import load_book
+from connect4.engines import make_engine, parse_spec
+from connect4.heatmap import render_file, write_table
+from connect4.ratings import fit_ratings, format_ratings
+from connect4.records import GameRecorder
+from connect4.scheduler import run_games
+from connect4.seeding import SEED_BITS, derive_seed, fresh_seed
 
 
 # Utility Functions for Board
-def create_board():
-    """Create an empty board."""
-    return [[EMPTY for _ in range(COLS)] for _ in range(ROWS)]
+def create_board(geometry=STANDARD):
+    """Create an empty board (Red moves first)."""
+    return Position(geometry=geometry)
 
 
 def print_board(board):
     """Display the current state of the board."""
-    for row in board:
+    for row in board.to_rows():
         print(" ".join(row))
     print()
 
 
-def is_valid_move(board, col):
-    """Check if a move is valid (i.e., the column is not full)."""
-    return board[0][col] == EMPTY
-
-
 def get_valid_moves(board):
     """Return a list of valid columns where a move can be made."""
-    return [col for col in range(COLS) if is_valid_move(board, col)]
-
-
-def drop_piece(board, row, col, piece):
-    """Drop a piece into the board."""
-    board[row][col] = piece
-
-
-def get_next_open_row(board, col):
-    """Get the next open row in the column."""
-    for row in range(ROWS - 1, -1, -1):
-        if board[row][col] == EMPTY:
-            return row
-
-
-def check_win(board, piece):
-    """Check for a win."""
-    # Check horizontal locations for win
-    for c in range(COLS - WINNING_LENGTH + 1):
-        for r in range(ROWS):
-            if all(board[r][c + i] == piece for i in range(WINNING_LENGTH)):
-                return True
-
-    # Check vertical locations for win
-    for c in range(COLS):
-        for r in range(ROWS - WINNING_LENGTH + 1):
-            if all(board[r + i][c] == piece for i in range(WINNING_LENGTH)):
-                return True
-
-    # Check positively sloped diagonals
-    for c in range(COLS - WINNING_LENGTH + 1):
-        for r in range(ROWS - WINNING_LENGTH + 1):
-            if all(board[r + i][c + i] == piece for i in range(WINNING_LENGTH)):
-                return True
-
-    # Check negatively sloped diagonals
-    for c in range(COLS - WINNING_LENGTH + 1):
-        for r in range(WINNING_LENGTH - 1, ROWS):
-            if all(board[r - i][c + i] == piece for i in range(WINNING_LENGTH)):
-                return True
-
-    return False
+    return board.legal_moves()
 
 
 def is_terminal_node(board):
     """Check if the board is a terminal node (win or draw)."""
-    return (
-        check_win(board, RED)
-        or check_win(board, YELLOW)
-        or len(get_valid_moves(board)) == 0
-    )
-
-
-def evaluate_board(board, piece):
-    """Evaluate the board state."""
-    if check_win(board, piece):
-        return 1 if piece == YELLOW else -1
-    return 0
+    return board.last_move_won() or board.is_full()
 
 
-# Algorithm 1: Uniform Random
-def uniform_random(board, player, _=None):
-    """Select a random valid move."""
-    valid_moves = get_valid_moves(board)
-    return random.choice(valid_moves)
-
-
-# Algorithm 2: Pure Monte Carlo Game Search (PMCGS)
-def pmcgs(board, player, num_simulations):
-    """Run Pure Monte Carlo Search."""
-    valid_moves = get_valid_moves(board)
-    move_scores = {col: 0 for col in valid_moves}
-
-    for col in valid_moves:
-        for _ in range(num_simulations):
-            temp_board = [row[:] for row in board]  # Copy the board
-            row = get_next_open_row(temp_board, col)
-            drop_piece(temp_board, row, col, player)
-            winner = run_simulation(temp_board, switch_player(player))
-            move_scores[col] += winner
-
-    # Select the move with the highest score
-    best_move = max(move_scores, key=move_scores.get)
-    return best_move
-
-
-def run_simulation(board, player):
-    """Run a random simulation from the current board state."""
-    current_player = player
-    while not is_terminal_node(board):
-        valid_moves = get_valid_moves(board)
-        col = random.choice(valid_moves)
-        row = get_next_open_row(board, col)
-        drop_piece(board, row, col, current_player)
-        current_player = switch_player(current_player)
-
-    if check_win(board, YELLOW):
-        return 1
-    elif check_win(board, RED):
-        return -1
-    return 0
-
-
-# Updated best move selection in UCT
-def uct(board, player, num_simulations, exploration=1.41):
-    """Run UCT algorithm."""
-    valid_moves = get_valid_moves(board)
-    move_stats = {
-        col: {"wins": 0, "plays": 1} for col in valid_moves
-    }  # Initialize plays with 1
-
-    for _ in range(num_simulations):
-        col = select_move_uct(move_stats, valid_moves, exploration)
-        temp_board = [row[:] for row in board]
-        row = get_next_open_row(temp_board, col)
-        drop_piece(temp_board, row, col, player)
-        winner = run_simulation(temp_board, switch_player(player))
-        update_stats(move_stats, col, winner)
-
-    # Filter out moves with zero plays before calculating best move
-    best_move = max(
-        (col for col in valid_moves if move_stats[col]["plays"] > 0),
-        key=lambda col: move_stats[col]["wins"] / move_stats[col]["plays"],
-    )
-    return best_move
-
-
-def select_move_uct(move_stats, valid_moves, exploration):
-    """Select a move using UCB."""
-    total_plays = sum(move_stats[col]["plays"] for col in valid_moves)
-    ucb_values = {}
-
-    for col in valid_moves:
-        wins, plays = move_stats[col]["wins"], move_stats[col]["plays"]
-        if plays == 0:
-            ucb_values[col] = float("inf")  # Force exploration of this move
-        else:
-            avg_win = wins / plays
-            ucb_values[col] = avg_win + exploration * math.sqrt(
-                math.log(total_plays) / plays
-            )
-
-    return max(ucb_values, key=ucb_values.get)
-
-
-def update_stats(move_stats, col, result):
-    """Update win/play statistics after a simulation."""
-    move_stats[col]["plays"] += 1
-    move_stats[col]["wins"] += result
-
-
-def switch_player(player):
-    """Switch the current player."""
-    return YELLOW if player == RED else RED
+# The engines, as specs of connect4.engines, named after the simulations they run:
+# the algorithms of this tournament play without the endgame solver, with the
+# classic exploration constant for UCT
+ALGORITHMS = [
+    ("UR", "ur"),
+    ("PMCGS (5)", "pmcgs:sims=5,solve=-1"),
+    ("PMCGS (100)", "pmcgs:sims=100,solve=-1"),
+    ("UCT (5)", "uct:sims=5,c=1.41,solve=-1"),
+    ("UCT (100)", "uct:sims=100,c=1.41,solve=-1"),
+]
 
 
 # Running the tournament
-def play_game(
-    algorithm1, algorithm2, num_simulations1, num_simulations2, verbose=False
-):
-    board = create_board()
-    current_player = RED  # Start with Red
-    algorithms = {RED: algorithm1, YELLOW: algorithm2}
+def play_game(spec1, spec2, verbose=False, book_path=None, seed=None, geometry=STANDARD):
+    """Play one game between two engine specs and return its result and record.
+
+    Every move is searched with its own seed drawn from the game's ``seed``
+    stream.  With an opening book, the searching engines play its move in
+    every position it contains.  The record (see connect4.records) holds the
+    moves with the search time and playouts of each.
+    """
+    board = create_board(geometry)
+    rng = random.Random(seed)
+    book = load_book(book_path) if book_path else None
+    players = {RED: make_engine(spec1, book=book), YELLOW: make_engine(spec2, book=book)}
+    recorder = GameRecorder(board, [spec1, spec2])
 
     while not is_terminal_node(board):
         if verbose:
             print_board(board)
-        valid_moves = get_valid_moves(board)
-        if current_player == RED:
-            move = algorithm1(board, RED, num_simulations1)
-        else:
-            move = algorithm2(board, YELLOW, num_simulations2)
-
-        row = get_next_open_row(board, move)
-        drop_piece(board, row, move, current_player)
-        if check_win(board, current_player):
-            return 1 if current_player == YELLOW else -1
-        current_player = switch_player(current_player)
-
-    return 0  # Draw
-
-
-def run_tournament():
-    algorithms = [
-        ("UR", uniform_random, 0),
-        ("PMCGS (500)", pmcgs, 5),
-        ("PMCGS (10000)", pmcgs, 100),
-        ("UCT (500)", uct, 5),
-        ("UCT (10000)", uct, 100),
+        start = time.perf_counter()
+        result = players[board.player].search(board, seed=rng.getrandbits(SEED_BITS))
+        recorder.add(result.move, time.perf_counter() - start, result.stats)
+
+        board.play(result.move)
+        if board.last_move_won():
+            return WIN_VALUES[board.turn ^ 1], recorder.record()
+
+    return 0, recorder.record()  # Draw
+
+
+def run_tournament(results_path="tournament_results.jsonl", workers=1, book_path=None, seed=None,
+                   geometry=STANDARD, algorithms=ALGORITHMS, records_path=None):
+    names = [name for name, _ in algorithms]
+    if records_path is None:
+        records_path = os.path.splitext(results_path)[0] + ".games.gz"
+
+    # Every ordered pairing plays 100 games; games already logged are not replayed.
+    # Each game's seed comes from the master seed and its id, and is logged with it.
+    # Games on other boards than the standard one have the board size in their ids
+    if seed is None:
+        seed = fresh_seed()
+    print(f"Seed: {seed}")
+    prefix = f"{geometry.name}|" if geometry != STANDARD else ""
+    games = [
+        (
+            game_id,
+            {"red": name1, "yellow": name2, "seed": derive_seed(seed, game_id)},
+            (spec1, spec2, False, book_path, derive_seed(seed, game_id), geometry),
+        )
+        for i, (name1, spec1) in enumerate(algorithms)
+        for j, (name2, spec2) in enumerate(algorithms)
+        if i != j
+        for game in range(100)
+        for game_id in [f"{prefix}{name1}|{name2}|{game}"]
     ]
-
-    results = np.zeros((len(algorithms), len(algorithms)))
-
-    for i, (name1, algo1, sims1) in enumerate(algorithms):
-        for j, (name2, algo2, sims2) in enumerate(algorithms):
-            if i != j:
-                for _ in range(100):  # Play 100 games
-                    result = play_game(algo1, algo2, sims1, sims2, verbose=False)
-                    if result == 1:
-                        results[i][j] += 1  # Algo1 wins
-                    elif result == -1:
-                        results[j][i] += 1  # Algo2 wins
-
-    # Display results as a heatmap
-    fig, ax = plt.subplots()
-    cax = ax.matshow(results, cmap="Blues")
-
-    # Add color bar
-    plt.colorbar(cax)
-
-    # Set up axes
-    ax.set_xticks(np.arange(len(algorithms)))
-    ax.set_yticks(np.arange(len(algorithms)))
-    ax.set_xticklabels([name for name, _, _ in algorithms], rotation=45, ha="right")
-    ax.set_yticklabels([name for name, _, _ in algorithms])
-
-    # Add labels
-    plt.xlabel("Opponent Algorithm")
-    plt.ylabel("Player Algorithm")
-    plt.title("Tournament Results (%)")
-
-    # Annotate the heatmap with percentage values
-    for (i, j), value in np.ndenumerate(results):
-        if i != j:  # Skip diagonal
-            ax.text(j, i, f"{value:.1f}%", ha="center", va="center", color="black")
-
-    plt.show()
+    records = run_games(games, play_game, results_path, workers, records_path)
+
+    # wins[i][j]: games algorithm i won against j, with either colour
+    scheduled = {game_id for game_id, _, _ in games}
+    size = len(names)
+    wins = [[0] * size for _ in range(size)]
+    draws = [[0] * size for _ in range(size)]
+    for record in records:
+        if record["game_id"] not in scheduled:
+            continue  # Another board size or other engines sharing the log
+        i, j = names.index(record["red"]), names.index(record["yellow"])
+        if record["result"] == WIN_VALUES[0]:
+            wins[i][j] += 1  # Algo1 (Red) wins
+        elif record["result"] == WIN_VALUES[1]:
+            wins[j][i] += 1  # Algo2 (Yellow) wins
+        else:
+            draws[i][j] += 1
+            draws[j][i] += 1
+
+    # Elo ratings over both colours of every pairing
+    outcomes = {
+        (names[i], names[j]): (wins[i][j], draws[i][j], wins[j][i])
+        for i in range(size)
+        for j in range(i + 1, size)
+    }
+    print("Elo ratings (95% error bars):")
+    for line in format_ratings(fit_ratings(outcomes)):
+        print(line)
+
+    # The table behind the heatmap, rendered on demand by connect4.heatmap
+    data_path = os.path.splitext(results_path)[0] + ".json"
+    write_table(data_path, seed, geometry, names, wins, draws)
+    print(f"Results table: {data_path}")
+    print(f"Game records: {records_path}")
+    return data_path
 
 
 if __name__ == "__main__":
-    run_tournament()
+    parser = argparse.ArgumentParser(description="Round robin tournament between the engines")
+    parser.add_argument("--workers", type=int, default=1, help="games played in parallel")
+    parser.add_argument(
+        "--results", default="tournament_results.jsonl",
+        help="game log (JSONL); finished games in it are not replayed",
+    )
+    parser.add_argument(
+        "--records", metavar="FILE",
+        help="compressed log of every game's moves, specs, seed and per-move time and "
+        "playouts (default: the --results name with .games.gz); see connect4.records",
+    )
+    parser.add_argument(
+        "--book", metavar="FILE",
+        help="opening book (built by connect4.book) used by the PMCGS and UCT players",
+    )
+    parser.add_argument(
+        "--seed", type=int, help="master seed; every game's seed is derived from it and logged"
+    )
+    parser.add_argument(
+        "--engines", nargs="+", metavar="SPEC",
+        help="play these engine specs (e.g. ur pmcgs:sims=50 uct:sims=200,c=0.8) instead of "
+        "the default five",
+    )
+    parser.add_argument(
+        "--heatmap", metavar="FILE",
+        help="also render the results as a heatmap image (.png or .svg); "
+        "python -m connect4.heatmap renders a saved results table later",
+    )
+    parser.add_argument(
+        "--size", default="7x6", metavar="WxH", help="board width and height (default 7x6)"
+    )
+    parser.add_argument(
+        "--win-length", type=int, default=4, metavar="N",
+        help="pieces in a row needed to win (default 4)",
+    )
+    args = parser.parse_args()
+    try:
+        width, height = (int(side) for side in args.size.lower().split("x"))
+        geometry = get_geometry(width, height, args.win_length)
+    except ValueError as error:
+        parser.error(f"--size/--win-length: {error}")
+    algorithms = ALGORITHMS
+    if args.engines:
+        for spec in args.engines:
+            try:
+                parse_spec(spec)
+            except ValueError as error:
+                parser.error(f"--engines: {error}")
+        algorithms = [(spec, spec) for spec in args.engines]
+    data_path = run_tournament(
+        args.results, args.workers, args.book, args.seed, geometry, algorithms, args.records
+    )
+    if args.heatmap:
+        render_file(data_path, args.heatmap)
+        print(f"Heatmap: {args.heatmap}")